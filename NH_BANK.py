@@ -4,11 +4,7 @@ from selenium.webdriver.support.ui import Select, WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import ElementClickInterceptedException, TimeoutException
-from bs4 import BeautifulSoup as bs
-from dateutil import parser
 from datetime import datetime
-import re
-import pandas as pd
 import calendar
 import time
 import pyautogui
@@ -16,40 +12,124 @@ from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import NoAlertPresentException
 import os
 import shutil
-import glob
-from selenium.webdriver.common.action_chains import ActionChains
 import pygetwindow as gw
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from cdp_input import type_with_cdp
+from downloads import DownloadTracker
+from resource_policy import apply_lean_profile, apply_resource_policy, measure_page_load
+from excel_stream import (KEEP_LOCAL_FILES, iter_sheet_rows, new_buffer, result_name, transform_upload_workbook,
+                          write_rows_xlsx, write_transaction_workbooks_stream)
+from nh_parser import RESULT_TABLE_SELECTOR, parse_result_table
+from transactions import parse_amount  # noqa: F401 - 기존 NH_BANK.parse_amount 유지 (업로드 변환 / 법인 모듈에서 사용)
+from metrics import current_tags, request_context, span
+from transaction_cache import renumber_rows, sequence_column_index
+from bank_errors import bank_alert_error
+from waits import wait_until, document_ready, row_count_greater_than, element_gone, element_focused, value_accepted, any_of, count_elements
 
 NH_BANK_URL = "https://banking.nonghyup.com/servlet/IPMSP0011I.view"
+BANK_CODE = 'BANK001'
+RESULT_ROW_SELECTOR = '#hiddenResult table.tb_col tbody tr'
+MORE_BUTTON_SELECTOR = '#moreBtnArea span.btn3 a'
+
+# 'table': 조회결과 테이블을 바로 파싱해 엑셀 생성 / 'oz': 오즈리포트 엑셀 다운로드
+EXTRACT_MODE = 'table'
+
+# 'harvest': 더보기 페이지마다 새로 붙은 행만 가져오고 DOM 에서 제거 (페이지가 늘어나도 속도 / 메모리 일정)
+# 'table': 더보기를 끝까지 누른 뒤 테이블 전체를 한 번에 파싱
+# harvest 는 실제 은행 화면의 행을 지우므로 모의 페이지 외에 검증되기 전까지는 'table' 을 기본으로 유지
+ROW_EXTRACT = 'table'
+
+# 현재 결과 행을 셀 텍스트 배열로 한 번에 가져오고 가져온 행 노드는 삭제
+HARVEST_ROWS_SCRIPT = """
+var rows = document.querySelectorAll(arguments[0]);
+var text = function (el) { return (el.innerText || el.textContent || '').replace(/\\s+/g, ' ').trim(); };
+var headers = arguments[1] ? Array.prototype.map.call(document.querySelectorAll(arguments[1]), text) : null;
+var records = [];
+for (var i = 0; i < rows.length; i++) {
+  var cells = rows[i].querySelectorAll('td');
+  if (cells.length > 1) {
+    records.push(Array.prototype.map.call(cells, text));
+  }
+  rows[i].remove();
+}
+return {headers: headers, rows: records};
+"""
+
+# 긴 조회기간을 월 단위 구간으로 나눠 조회 (None 이면 분할하지 않음)
+# 동시 조회용 추가 브라우저는 워커의 세션풀 / 스케줄러 한도 안에서만 받음 (extra_driver), 없으면 한 브라우저로 차례대로
+RANGE_CHUNK_MONTHS = 1
+RANGE_CHUNK_MIN_MONTHS = 3
+RANGE_CHUNK_PARALLEL = 3
+
+# 'cdp': DevTools 로 대상 요소에 직접 키 입력 (헤드리스 / 동시 실행 가능)
+# 'pyautogui': OS 키보드로 입력 (화면에 보이고 포커스된 창 필요)
+INPUT_BACKEND = 'cdp'
+HEADLESS = False
+
+# 더보기 버튼이 보이지 않을 때 마지막 페이지로 판단하기 전 확인하는 시간
+# (다음 페이지 로딩 중 버튼을 숨기거나 다시 그리는 경우 행 누락 방지)
+PAGINATION_SETTLE = 5
+
+# 오즈리포트 엑셀저장 실패 시 로그인 / 조회가 끝난 같은 화면에서 다시 시도하는 횟수
+OZ_EXPORT_ATTEMPTS = 3
+
+# pyautogui 입력은 포커스된 창으로 들어가므로 동시에 한 브라우저만 입력
+_keyboard_lock = threading.Lock()
+
+def type_with_keyboard(selector, text, driver, interval=0.3, timeout=15, retries=3, is_secure=False, backend=None):
+    if (backend or INPUT_BACKEND) == 'cdp':
+        return type_with_cdp(selector, text, driver, timeout=timeout, retries=retries, is_secure=is_secure)
 
-def type_with_keyboard(selector, text, driver, interval=0.3, timeout=15, retries=3, is_secure=False):
     wait = WebDriverWait(driver, timeout)
     element = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, selector)))
 
     for attempt in range(retries):
         element.click()
         # element.clear()
-        time.sleep(1)  # clear 후 1초 대기
+        wait_until(driver, element_focused(element), timeout=5, description=f"{selector} 포커스",
+                   raise_on_timeout=False)
         element.click()
-        time.sleep(1)
         pyautogui.write(text, interval=interval)
         if is_secure:
             return True
-        else:
-            entered_value = element.get_attribute('value').replace('-', '').strip()
-            if entered_value == text:
-                return True
-        time.sleep(1)
+        if wait_until(driver, value_accepted(element, text), timeout=3,
+                      description=f"{selector} 입력값 확인", raise_on_timeout=False):
+            return True
     raise ValueError(f"입력 실패 [{selector}]")
 
-def save_page_source(driver, filename='page_source.html'):
-    with open(filename, 'w', encoding='utf-8') as f:
+def raise_for_alert(driver):
+    """조회 후 뜬 경고창(비밀번호 / 생년월일 오류 등)을 닫고 에러로 변환 - 인증 오류는 BankLoginError (재시도 안 함)"""
+    try:
+        alert = driver.switch_to.alert
+        message = alert.text
+        alert.accept()
+    except NoAlertPresentException:
+        return
+    raise bank_alert_error(message)
+
+def save_page_source(driver, download_dir=None, filename='page_source.html'):
+    """디버깅용 조회결과 HTML 저장 - 거래내역이 그대로 남으므로 로컬 보관 설정 시에만 요청별 폴더에 저장"""
+    if not KEEP_LOCAL_FILES or not download_dir:
+        return None
+    os.makedirs(download_dir, exist_ok=True)
+    path = os.path.join(download_dir, filename)
+    with open(path, 'w', encoding='utf-8') as f:
         f.write(driver.page_source)
+    return path
 
 
-def get_driver(PATH, download_dir):
+def get_driver(PATH, download_dir, headless=HEADLESS, user_data_dir=None):
     options = Options()
-    options.add_argument("--start-maximized")
+    if user_data_dir:
+        options.add_argument(f"--user-data-dir={user_data_dir}")  # 세션풀의 세션별 프로필
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1920,1080")
+    else:
+        options.add_argument("--start-maximized")
     options.add_argument("--disable-popup-blocking") 
     options.add_argument("--disable-notifications")
 
@@ -60,11 +140,26 @@ def get_driver(PATH, download_dir):
         "download.directory_upgrade": True,
         "safebrowsing.enabled": True
     }
+    apply_lean_profile(options, prefs)  # 확장 / 백그라운드 서비스 / 세이프브라우징 조회 끔
     options.add_experimental_option("prefs", prefs)
+
+    # 다운로드 완료 감지용 DevTools 이벤트 수신 (Page 이벤트만 기록해 로그량 최소화)
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": False, "enablePage": True})
     
     service = Service(executable_path=PATH)
     return webdriver.Chrome(service=service, options=options)
 
+@contextmanager
+def keyboard_input_guard(driver):
+    """pyautogui 입력 시에만 창을 앞으로 가져오고 다른 브라우저의 입력과 겹치지 않도록 잠금"""
+    if INPUT_BACKEND != 'pyautogui':
+        yield
+        return
+    with _keyboard_lock:
+        driver.switch_to.window(driver.current_window_handle)  # 입력할 창을 앞으로
+        yield
+
 def activate_chrome_window():
     # 'Chrome' 창 목록 찾기
     chrome_windows = [w for w in gw.getWindowsWithTitle('Chrome') if w.isVisible]
@@ -109,21 +204,46 @@ def debug_excel_button_xpath(driver):
     driver.close()  # 디버그 후 오즈 창 닫기
     driver.switch_to.window(original_window)
 
-def click_more_button_until_end(driver, timeout=10):
-    wait = WebDriverWait(driver, timeout)
+def more_pages_pending(driver, row_count, settle=PAGINATION_SETTLE):
+    """더보기 버튼이 안 보일 때 settle 초 안에 버튼이 다시 보이거나 행이 늘어나면 True (아직 로딩 중)"""
+    return bool(wait_until(
+        driver,
+        any_of(EC.element_to_be_clickable((By.CSS_SELECTOR, MORE_BUTTON_SELECTOR)),
+               row_count_greater_than(RESULT_ROW_SELECTOR, row_count)),
+        timeout=settle,
+        description=f"마지막 페이지 확인 ({row_count}행)",
+        raise_on_timeout=False
+    ))
+
+def click_more_button_until_end(driver, timeout=30, button_grace=2):
     while True:
-        try:
-            # 더보기 버튼이 보이고 클릭 가능할 때까지 대기
-            more_button = wait.until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "#moreBtnArea span.btn3 a"))
-            )
-            driver.execute_script("arguments[0].click();", more_button)
-            print("더보기 버튼 클릭 완료. 다음 내역을 불러오는 중...")
-            time.sleep(6)  # 다음 데이터를 로드할 때까지의 대기시간
-        except TimeoutException:
+        # 더보기 버튼이 보이고 클릭 가능할 때까지 잠깐만 대기 (마지막 페이지에서 오래 기다리지 않도록)
+        more_button = wait_until(
+            driver,
+            EC.element_to_be_clickable((By.CSS_SELECTOR, MORE_BUTTON_SELECTOR)),
+            timeout=button_grace,
+            description="더보기 버튼 표시",
+            raise_on_timeout=False
+        )
+        if not more_button:
+            # 로딩이 끝난 뒤에도 행 수가 그대로이고 버튼이 없을 때만 종료
+            if more_pages_pending(driver, count_elements(driver, RESULT_ROW_SELECTOR)):
+                continue
             print("더보기 버튼이 더 이상 없습니다. 모든 내역을 불러왔습니다.")
             break  # 더보기 버튼이 없으면 반복문 종료
 
+        row_count = count_elements(driver, RESULT_ROW_SELECTOR)
+        driver.execute_script("arguments[0].click();", more_button)
+        print("더보기 버튼 클릭 완료. 다음 내역을 불러오는 중...")
+
+        # 행이 추가되거나 더보기 버튼이 사라지면 바로 다음 단계로 진행
+        wait_until(
+            driver,
+            any_of(row_count_greater_than(RESULT_ROW_SELECTOR, row_count), element_gone(MORE_BUTTON_SELECTOR)),
+            timeout=timeout,
+            description=f"더보기 결과 로딩 (기존 {row_count}행)"
+        )
+
 def debug_iframe_structure(driver):
     original_window = switch_to_new_window(driver)
     time.sleep(3)
@@ -193,44 +313,46 @@ def set_input_via_js(selector, value, driver, timeout=15):
         "arguments[0].dispatchEvent(new Event('change', {bubbles:true}));", element
     )
 
-def _get_transactions(driver, bank, pw, birthday, start_date, end_date):
-    driver.get(NH_BANK_URL)
-    
-    wait = WebDriverWait(driver, 20)
-    wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '#InqGjaNbr')))
-    time.sleep(5)
-
-
-    type_with_keyboard('#InqGjaNbr', bank, driver)
-    time.sleep(1)
+def _get_transactions(driver, bank, pw, birthday, start_date, end_date, paginate=True, download_dir=None):
+    with span('nh_page_load'):
+        # 배너 / 폰트 / 추적 스크립트 차단 (더보기 재조회에도 유지, 보안모듈 / 오즈리포트는 제외)
+        apply_resource_policy(driver, BANK_CODE)
+        driver.get(NH_BANK_URL)
 
-    type_with_keyboard('#GjaSctNbr', pw, driver)
-    time.sleep(1)
+        wait_until(driver, document_ready, timeout=20, description="조회 페이지 로딩")
+        wait_until(driver, EC.element_to_be_clickable((By.CSS_SELECTOR, '#InqGjaNbr')), timeout=20,
+                   description="계좌번호 입력창 활성화")
+    measure_page_load(driver, 'nh_page_resources')
 
+    with span('nh_login_input'), keyboard_input_guard(driver):
+        type_with_keyboard('#InqGjaNbr', bank, driver)
+        type_with_keyboard('#GjaSctNbr', pw, driver)
+        type_with_keyboard('#rlno1', birthday, driver)
 
-    type_with_keyboard('#rlno1', birthday, driver)
-    time.sleep(1)
+    with span('nh_search'):
+        Select(driver.find_element(By.CSS_SELECTOR, "select[name='start_year']")).select_by_value(start_date.strftime("%Y"))
+        Select(driver.find_element(By.CSS_SELECTOR, "select[name='start_month']")).select_by_value(start_date.strftime("%m"))
+        Select(driver.find_element(By.CSS_SELECTOR, "select[name='start_date']")).select_by_value(start_date.strftime("%d"))
 
-    Select(driver.find_element(By.CSS_SELECTOR, "select[name='start_year']")).select_by_value(start_date.strftime("%Y"))
-    Select(driver.find_element(By.CSS_SELECTOR, "select[name='start_month']")).select_by_value(start_date.strftime("%m"))
-    Select(driver.find_element(By.CSS_SELECTOR, "select[name='start_date']")).select_by_value(start_date.strftime("%d"))
+        Select(driver.find_element(By.CSS_SELECTOR, "select[name='end_year']")).select_by_value(end_date.strftime("%Y"))
+        Select(driver.find_element(By.CSS_SELECTOR, "select[name='end_month']")).select_by_value(end_date.strftime("%m"))
+        Select(driver.find_element(By.CSS_SELECTOR, "select[name='end_date']")).select_by_value(end_date.strftime("%d"))
 
-    Select(driver.find_element(By.CSS_SELECTOR, "select[name='end_year']")).select_by_value(end_date.strftime("%Y"))
-    Select(driver.find_element(By.CSS_SELECTOR, "select[name='end_month']")).select_by_value(end_date.strftime("%m"))
-    Select(driver.find_element(By.CSS_SELECTOR, "select[name='end_date']")).select_by_value(end_date.strftime("%d"))
+        driver.find_element(By.CSS_SELECTOR, '#btn_search').click()
 
-    driver.find_element(By.CSS_SELECTOR, '#btn_search').click()
+        # 인증정보 오류는 결과 대신 경고창이 뜨므로 함께 기다렸다가 바로 실패 처리 (시간초과로 재시도되지 않도록)
+        wait_until(driver, any_of(EC.presence_of_element_located((By.CSS_SELECTOR, RESULT_ROW_SELECTOR)),
+                                  EC.alert_is_present()), timeout=20, description="조회 결과 표시")
+        raise_for_alert(driver)
 
-    wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '#hiddenResult table.tb_col tbody tr')))
-    click_more_button_until_end(driver)
-    save_page_source(driver)
+    if not paginate:
+        return []  # 더보기는 호출한 쪽에서 페이지별 수집 (iter_result_pages)
 
-    time.sleep(3)
-    return driver.find_elements(By.CSS_SELECTOR, '#hiddenResult table.tb_col tbody tr')
+    with span('nh_pagination'):
+        click_more_button_until_end(driver)
+    save_page_source(driver, download_dir, f"page_source_{start_date:%Y%m%d}_{end_date:%Y%m%d}.html")
 
-def parse_amount(amount_text):
-    amount_clean = re.sub(r'[^\d]', '', amount_text)
-    return int(amount_clean) if amount_clean else 0
+    return driver.find_elements(By.CSS_SELECTOR, RESULT_ROW_SELECTOR)
 
 def get_month_date_range(year, month):
     first_day = datetime(year, month, 1)
@@ -243,12 +365,109 @@ def get_month_date_range(year, month):
 
     return first_day, last_day
 
+def split_into_month_windows(start_date, end_date, months_per_chunk=1):
+    """조회기간을 달력 월 기준 구간 목록 [(시작일, 종료일), ...] 으로 분할
+    get_month_date_range 가 각 월 종료일을 오늘로 자르므로 종료일도 오늘로 맞춰 시작일 > 종료일인 구간이 생기지 않게 함"""
+    end_date = min(end_date, datetime.today())
+    months = []
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        first_day, last_day = get_month_date_range(year, month)
+        window = (max(first_day, start_date), min(last_day, end_date))
+        if window[0] <= window[1]:
+            months.append(window)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    windows = []
+    for idx in range(0, len(months), months_per_chunk):
+        group = months[idx:idx + months_per_chunk]
+        windows.append((group[0][0], group[-1][1]))
+    return windows
+
+def is_descending_by_date(headers, rows):
+    """조회결과가 최신 거래부터 정렬되어 있는지 확인"""
+    date_idx = next((i for i, h in enumerate(headers) if '일' in h and '거래' in h), 0 if headers else None)
+    if date_idx is None:
+        return False
+    values = [row[date_idx] for row in rows if len(row) > date_idx and row[date_idx]]
+    return len(values) > 1 and values[0] > values[-1]
+
+def merge_chunk_rows(chunks):
+    """구간별 (headers, rows) 를 기간 순서대로 합치고 경계 중복 행 제거 후 순번을 다시 매김"""
+    headers = next((h for h, _ in chunks if h), [])
+    ordered = list(chunks)
+    if any(is_descending_by_date(h or headers, r) for h, r in chunks):
+        ordered.reverse()
+
+    # 순번은 구간마다 1부터 다시 시작하므로 중복 비교에서 제외
+    seq_idx = sequence_column_index(headers)
+
+    def row_key(row):
+        return tuple(cell for idx, cell in enumerate(row) if idx != seq_idx)
+
+    merged = []
+    previous = set()
+    for _, rows in ordered:
+        current = [(row_key(row), row) for row in rows]
+        merged.extend(row for key, row in current if key not in previous)
+        previous = {key for key, _ in current}
+    return headers, renumber_rows(headers, merged)
+
+def fetch_range_in_chunks(PATH, bank, pw, birthday, windows, download_dir, driver=None, max_parallel=RANGE_CHUNK_PARALLEL,
+                          extra_driver=None):
+    """구간별로 나눠 조회. 기본 드라이버가 차례로 구간을 처리하고, extra_driver() 로 추가 드라이버를 받으면 함께 처리
+    (추가 드라이버는 호출한 쪽의 세션풀 / 은행 동시 실행 한도 안에서만 받음 - 여기서 크롬을 따로 띄우지 않음)"""
+    results = [None] * len(windows)
+    tags = current_tags()  # 요청 태그를 구간 조회 스레드로 전달
+    pending = queue.Queue()
+    for index in range(len(windows)):
+        pending.put(index)
+
+    def fetch_chunk(index, chunk_driver):
+        with request_context(chunk=index, **tags):
+            chunk_start, chunk_end = windows[index]
+            results[index] = collect_pages(
+                iter_search_pages(chunk_driver, bank, pw, birthday, chunk_start, chunk_end, download_dir)
+            )
+            print(f"구간 조회 완료: {chunk_start:%Y-%m-%d} ~ {chunk_end:%Y-%m-%d} ({len(results[index][1])}건)")
+
+    def run_chunks(chunk_driver):
+        while True:
+            try:
+                index = pending.get_nowait()
+            except queue.Empty:
+                return
+            fetch_chunk(index, chunk_driver)
+
+    def run_with_extra_driver():
+        with extra_driver() as chunk_driver:
+            if chunk_driver is not None:  # 한도 초과 시 기본 드라이버가 남은 구간 처리
+                run_chunks(chunk_driver)
+
+    owns_driver = driver is None
+    if owns_driver:
+        with span('nh_driver_start'):
+            driver = get_driver(PATH, download_dir)
+    try:
+        # 첫 구간은 혼자 조회해 인증정보를 확인 (틀렸으면 여러 브라우저에서 동시에 로그인 실패가 쌓이지 않도록)
+        fetch_chunk(pending.get_nowait(), driver)
+        extra_count = max(min(max_parallel, len(windows) - 1) - 1, 0) if extra_driver else 0
+        with ThreadPoolExecutor(max_workers=extra_count + 1) as executor:
+            futures = [executor.submit(run_chunks, driver)]
+            futures += [executor.submit(run_with_extra_driver) for _ in range(extra_count)]
+            for future in futures:
+                future.result()
+    finally:
+        if owns_driver:
+            driver.quit()
+
+    return merge_chunk_rows(results)
+
 def convert_xls_to_xlsx(src_file, dest_file):
-    # xls 읽기 (xlrd를 통해)
-    df = pd.read_excel(src_file, engine='xlrd')
-    
-    # xlsx로 저장하기 (openpyxl을 통해)
-    df.to_excel(dest_file, index=False, engine='openpyxl')
+    # xls 를 행 단위로 읽어 (xlrd) write-only 모드로 저장 (openpyxl) - 전체를 메모리에 올리지 않음
+    rows = iter_sheet_rows(src_file)
+    header = next(rows, ())
+    write_rows_xlsx(dest_file, header, rows)
 
 def type_securely(selector, text, driver, timeout=20):
     wait = WebDriverWait(driver, timeout)
@@ -264,38 +483,179 @@ def type_securely(selector, text, driver, timeout=20):
     driver.execute_script("arguments[0].dispatchEvent(new Event('change', { bubbles: true }));", element)
     time.sleep(0.5)
 
-def get_balance(PATH, bank, pw, birthday, start_date, end_date, download_dir):
-    driver = get_driver(PATH, download_dir)
-    
-    transactions = _get_transactions(driver, bank, pw, birthday, start_date, end_date)
-    
-    existing_files = glob.glob(os.path.join(download_dir, '*'))
-    for file in existing_files:
-        os.remove(file)
+def export_via_oz_report(driver, download_dir):
+    """오즈리포트 엑셀 다운로드 후 원본 / 업로드용 엑셀 생성"""
+    # 요청별 다운로드 폴더에서 이번 다운로드만 추적하므로 폴더를 비우지 않음
+    tracker = DownloadTracker(driver, download_dir).start()
 
     click_excel_button(driver)
     time.sleep(3)
 
     download_excel_from_oz_report(driver)
-    
+
     # 다운로드된 파일 기다리기
-    downloaded_file = wait_for_file_download(download_dir)
+    downloaded_file = tracker.wait()
 
     timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    if not KEEP_LOCAL_FILES:
+        # 다운로드 파일을 메모리로 읽고 바로 삭제, 원본 / 업로드용 모두 버퍼로 업로드
+        with open(downloaded_file, 'rb') as f:
+            data = f.read()
+        os.remove(downloaded_file)
+
+        xlsx_filename = new_buffer(f'NH_Transactions_{timestamp}.xlsx')
+        xlsx_filename.write(data)
+        xlsx_filename.seek(0)
+        upload_xlsx_filename = new_buffer(f'NH_Transactions_{timestamp}_upload.xlsx')
+        transform_upload_workbook(xlsx_filename, upload_xlsx_filename, read_and_transform_downloaded_excel)
+        return xlsx_filename, upload_xlsx_filename
+
     xlsx_filename = os.path.join(download_dir, f'NH_Transactions_{timestamp}.xlsx')
     upload_xlsx_filename = os.path.join(download_dir, f'NH_Transactions_{timestamp}_upload.xlsx')
 
     # 다운로드된 파일 바로 이동만 수행 (xls → xlsx 변환 없음)
     shutil.move(downloaded_file, xlsx_filename)
 
-    # 업로드 양식 엑셀파일 변환 및 저장
-    transformed_df = read_and_transform_downloaded_excel(xlsx_filename)
-    save_transformed_excel(transformed_df, upload_xlsx_filename)
+    # 업로드 양식 엑셀파일 변환 및 저장 (기존 변환 함수 결과를 write-only 모드로 저장)
+    transform_upload_workbook(xlsx_filename, upload_xlsx_filename, read_and_transform_downloaded_excel)
 
-    print(f"거래내역 엑셀 파일 저장 완료: {xlsx_filename}")
-    print(f"업로드용 엑셀 파일 저장 완료: {upload_xlsx_filename}")
+    return xlsx_filename, upload_xlsx_filename
+
+def close_extra_windows(driver):
+    """오즈리포트 팝업 등 추가 창을 닫고 조회 화면으로 복귀"""
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+
+def export_with_retries(driver, download_dir, attempts=OZ_EXPORT_ATTEMPTS):
+    """엑셀저장 단계만 재시도 (이미 끝난 로그인 / 조회 / 더보기는 다시 하지 않음)"""
+    for attempt in range(1, attempts + 1):
+        try:
+            with span('nh_oz_export', attempt=attempt):
+                return export_via_oz_report(driver, download_dir)
+        except Exception as e:
+            if attempt >= attempts:
+                raise
+            print(f"[오즈리포트 재시도 {attempt}/{attempts - 1}] 조회 화면 유지한 채 엑셀저장 재시도: {e}")
+            close_extra_windows(driver)
+
+def harvest_rows(driver, with_headers=False):
+    """화면에 있는 결과 행을 execute_script 1회로 가져오고 해당 노드를 DOM 에서 제거"""
+    result = driver.execute_script(HARVEST_ROWS_SCRIPT, RESULT_ROW_SELECTOR,
+                                   f"{RESULT_TABLE_SELECTOR} thead th" if with_headers else None)
+    return result['headers'], result['rows']
+
+def iter_result_pages(driver, timeout=30, button_grace=2):
+    """조회 직후부터 더보기가 끝날 때까지 페이지별 (headers, rows) 를 순서대로 반환"""
+    headers = None
+    page = 1
+    while True:
+        with span('nh_harvest_page', page=page):
+            page_headers, rows = harvest_rows(driver, with_headers=headers is None)
+        headers = headers or page_headers
+        if rows or page == 1:
+            yield headers, rows
+
+        more_button = wait_until(
+            driver,
+            EC.element_to_be_clickable((By.CSS_SELECTOR, MORE_BUTTON_SELECTOR)),
+            timeout=button_grace,
+            description="더보기 버튼 표시",
+            raise_on_timeout=False
+        )
+        if not more_button:
+            # 수집한 행은 DOM 에서 지웠으므로, 로딩이 끝난 뒤에도 새 행과 버튼이 모두 없을 때만 종료
+            if more_pages_pending(driver, count_elements(driver, RESULT_ROW_SELECTOR)):
+                page += 1
+                continue
+            print(f"더보기 버튼이 더 이상 없습니다. 모든 내역을 불러왔습니다. ({page}페이지)")
+            return
+
+        driver.execute_script("arguments[0].click();", more_button)
+        # 이전 행은 모두 제거했으므로 행이 하나라도 생기거나 더보기 버튼이 사라지면 다음 페이지 수집
+        wait_until(
+            driver,
+            any_of(row_count_greater_than(RESULT_ROW_SELECTOR, 0), element_gone(MORE_BUTTON_SELECTOR)),
+            timeout=timeout,
+            description=f"더보기 결과 로딩 ({page + 1}페이지)"
+        )
+        page += 1
+
+def collect_pages(pages):
+    headers, rows = [], []
+    for page_headers, page_rows in pages:
+        headers = headers or page_headers
+        rows.extend(page_rows)
+    return headers, rows
+
+def iter_search_pages(driver, bank, pw, birthday, start_date, end_date, download_dir=None):
+    """조회 후 결과를 (headers, rows) 페이지 단위로 반환 (ROW_EXTRACT 설정에 따라 페이지별 수집 / 일괄 파싱)"""
+    if ROW_EXTRACT == 'harvest':
+        _get_transactions(driver, bank, pw, birthday, start_date, end_date, paginate=False)
+        yield from iter_result_pages(driver)
+    else:
+        _get_transactions(driver, bank, pw, birthday, start_date, end_date, download_dir=download_dir)
+        yield read_result_table(driver)
+
+def read_result_table(driver):
+    """화면의 조회결과 테이블을 한 번에 가져와 (headers, rows) 로 파싱"""
+    with span('nh_parse_table'):
+        html = driver.execute_script("return document.querySelector('#hiddenResult').outerHTML;")
+        return parse_result_table(html)
+
+def iter_row_pages(PATH, bank, pw, birthday, start_date, end_date, download_dir, driver=None,
+                   chunk_months=RANGE_CHUNK_MONTHS, extra_driver=None):
+    """조회결과를 (headers, rows) 페이지 단위로 반환. 긴 기간은 월 단위 구간으로 나눠 조회 후 한 번에 반환"""
+    windows = split_into_month_windows(start_date, end_date, chunk_months) if chunk_months else []
+    if len(windows) > 1 and len(split_into_month_windows(start_date, end_date)) >= RANGE_CHUNK_MIN_MONTHS:
+        yield fetch_range_in_chunks(PATH, bank, pw, birthday, windows, download_dir, driver=driver,
+                                    extra_driver=extra_driver)
+        return
+
+    # 세션풀에서 받은 드라이버는 재사용하므로 여기서 종료하지 않음
+    owns_driver = driver is None
+    if owns_driver:
+        with span('nh_driver_start'):
+            driver = get_driver(PATH, download_dir)
 
-    driver.quit()
+    try:
+        yield from iter_search_pages(driver, bank, pw, birthday, start_date, end_date, download_dir)
+    finally:
+        if owns_driver:
+            driver.quit()
+
+def fetch_rows(PATH, bank, pw, birthday, start_date, end_date, download_dir, driver=None,
+               chunk_months=RANGE_CHUNK_MONTHS, extra_driver=None):
+    """조회결과 테이블을 (headers, rows) 로 반환. 긴 기간은 월 단위 구간으로 나눠 조회 (extra_driver 가 있으면 동시 조회)"""
+    return collect_pages(iter_row_pages(PATH, bank, pw, birthday, start_date, end_date, download_dir,
+                                        driver=driver, chunk_months=chunk_months, extra_driver=extra_driver))
+
+def get_balance(PATH, bank, pw, birthday, start_date, end_date, download_dir, driver=None, extract_mode=EXTRACT_MODE,
+                chunk_months=RANGE_CHUNK_MONTHS, extra_driver=None):
+    if extract_mode == 'table':
+        # 조회결과 테이블로 바로 엑셀 생성 (오즈리포트 생략)
+        # 더보기 페이지를 수집하는 대로 엑셀에 이어서 기록
+        pages = iter_row_pages(PATH, bank, pw, birthday, start_date, end_date, download_dir,
+                               driver=driver, chunk_months=chunk_months, extra_driver=extra_driver)
+        xlsx_filename, upload_xlsx_filename = write_transaction_workbooks_stream(
+            pages, download_dir, read_and_transform_downloaded_excel
+        )
+    else:
+        owns_driver = driver is None
+        if owns_driver:
+            with span('nh_driver_start'):
+                driver = get_driver(PATH, download_dir)
+        try:
+            _get_transactions(driver, bank, pw, birthday, start_date, end_date, download_dir=download_dir)
+            xlsx_filename, upload_xlsx_filename = export_with_retries(driver, download_dir)
+        finally:
+            if owns_driver:
+                driver.quit()
+
+    print(f"거래내역 엑셀 파일 저장 완료: {result_name(xlsx_filename)}")
+    print(f"업로드용 엑셀 파일 저장 완료: {result_name(upload_xlsx_filename)}")
 
     return xlsx_filename, upload_xlsx_filename
 
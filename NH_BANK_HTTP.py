@@ -0,0 +1,157 @@
+import logging
+import queue
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from bank_errors import bank_alert_error, find_alert_message
+from excel_stream import result_name, write_transaction_workbooks
+from nh_parser import make_soup, parse_result_table
+
+# 브라우저 없이 농협 개인 빠른조회(IPMSP0011I)를 HTTP로 직접 요청하는 엔진
+# 보안키패드 암호화가 필요한 경우 등 실패하면 main 에서 Selenium(NH_BANK) 경로로 대체 실행됨
+
+NH_BANK_URL = "https://banking.nonghyup.com/servlet/IPMSP0011I.view"
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36")
+HTTP_TIMEOUT = 20
+HTTP_POOL_SIZE = 8
+MAX_PAGES = 500
+
+SEARCH_FORM_FIELD = 'InqGjaNbr'
+MORE_BUTTON_SELECTOR = '#moreBtnArea span.btn3 a'
+
+
+class HttpSessionPool:
+    """커넥션을 유지하는 requests.Session 재사용 풀 (쿠키는 요청마다 초기화)"""
+
+    def __init__(self, size=HTTP_POOL_SIZE):
+        self.size = size
+        self._idle = queue.LifoQueue()
+
+    def _create(self):
+        session = requests.Session()
+        # 조회 / 더보기 POST 는 재전송하면 페이지가 중복되거나 건너뛸 수 있으므로 GET 만 자동 재시도
+        retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({'GET', 'HEAD'}))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.size, max_retries=retry)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers['User-Agent'] = USER_AGENT
+        return session
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._create()
+
+    def release(self, session):
+        session.cookies.clear()
+        if self._idle.qsize() < self.size:
+            self._idle.put(session)
+        else:
+            session.close()
+
+
+session_pool = HttpSessionPool()
+
+
+def hidden_inputs(form):
+    """폼의 hidden 값(토큰, 다음조회 키 등) 수집"""
+    data = {}
+    if form is None:
+        return data
+    for field in form.select("input[type='hidden']"):
+        name = field.get('name')
+        if name:
+            data[name] = field.get('value', '')
+    return data
+
+
+def find_search_form(soup):
+    field = soup.find(attrs={'name': SEARCH_FORM_FIELD}) or soup.find(id=SEARCH_FORM_FIELD)
+    if field is not None and field.find_parent('form') is not None:
+        return field.find_parent('form')
+    return soup.find('form')
+
+
+def inquiry_fields(bank, pw, birthday, start_date, end_date):
+    return {
+        'InqGjaNbr': bank,
+        'GjaSctNbr': pw,
+        'rlno1': birthday,
+        'start_year': start_date.strftime("%Y"),
+        'start_month': start_date.strftime("%m"),
+        'start_date': start_date.strftime("%d"),
+        'end_year': end_date.strftime("%Y"),
+        'end_month': end_date.strftime("%m"),
+        'end_date': end_date.strftime("%d"),
+    }
+
+
+def fetch_transaction_rows(session, bank, pw, birthday, start_date, end_date, base_url=NH_BANK_URL):
+    """조회 폼 제출 후 더보기 페이지를 끝까지 따라가며 헤더와 전체 행 반환"""
+    resp = session.get(base_url, timeout=HTTP_TIMEOUT)
+    resp.raise_for_status()
+    form = find_search_form(make_soup(resp.content))
+    if form is None:
+        raise RuntimeError("조회 폼을 찾을 수 없습니다.")
+
+    action_url = urljoin(resp.url, form.get('action') or base_url)
+    fields = inquiry_fields(bank, pw, birthday, start_date, end_date)
+    data = {**hidden_inputs(form), **fields}
+
+    headers, rows = [], []
+    for page in range(1, MAX_PAGES + 1):
+        resp = session.post(action_url, data=data, timeout=HTTP_TIMEOUT)
+        resp.raise_for_status()
+        soup = make_soup(resp.content)
+
+        page_headers, page_rows = parse_result_table(soup)
+        if page == 1 and not page_headers and not page_rows:
+            # 인증정보 오류는 alert 스크립트로 내려옴 - BankLoginError 로 바꿔 재시도 / selenium 대체 없이 실패
+            message = find_alert_message(resp.text)
+            if message:
+                raise bank_alert_error(message)
+            raise RuntimeError("조회 결과 테이블이 없습니다. (입력값 오류 또는 응답 형식 변경)")
+        headers = headers or page_headers
+        rows.extend(page_rows)
+        logging.info(f"[HTTP 조회] {page}페이지 {len(page_rows)}건 (누적 {len(rows)}건)")
+
+        # 다음 페이지는 응답에 담긴 hidden 값(다음조회 키)을 이어 붙여 재요청
+        if not page_rows or soup.select_one(MORE_BUTTON_SELECTOR) is None:
+            break
+        data = {**hidden_inputs(find_search_form(soup)), **fields}
+    else:
+        # 일부 행만 반환하면 거래내역 캐시에 확정 저장되므로 실패 처리
+        raise RuntimeError(f"최대 페이지 수({MAX_PAGES}) 도달 - 조회결과가 잘렸을 수 있습니다. (누적 {len(rows)}건)")
+
+    return headers, rows
+
+
+def fetch_rows(PATH, bank, pw, birthday, start_date, end_date, download_dir=None, base_url=NH_BANK_URL):
+    """풀의 HTTP 세션으로 조회해 (headers, rows) 반환"""
+    session = session_pool.acquire()
+    try:
+        return fetch_transaction_rows(session, bank, pw, birthday, start_date, end_date, base_url)
+    finally:
+        session_pool.release(session)
+
+
+def get_balance(PATH, bank, pw, birthday, start_date, end_date, download_dir, base_url=NH_BANK_URL):
+    # PATH 는 Selenium 엔진과 호출 형태를 맞추기 위한 인자 (사용하지 않음)
+    # 업로드 양식은 Selenium 엔진과 같은 기존 변환 함수 사용 (엑셀을 만들 때만 NH_BANK 를 import)
+    from NH_BANK import read_and_transform_downloaded_excel
+
+    headers, rows = fetch_rows(PATH, bank, pw, birthday, start_date, end_date, download_dir, base_url)
+    xlsx_filename, upload_xlsx_filename = write_transaction_workbooks(
+        headers, rows, download_dir, read_and_transform_downloaded_excel
+    )
+
+    print(f"거래내역 엑셀 파일 저장 완료: {result_name(xlsx_filename)}")
+    print(f"업로드용 엑셀 파일 저장 완료: {result_name(upload_xlsx_filename)}")
+
+    return xlsx_filename, upload_xlsx_filename
@@ -0,0 +1,48 @@
+import re
+
+# 은행 조회 에러 분류 (재시도 여부 판단)
+# 농협 등은 비밀번호 / 생년월일 오류가 5회 누적되면 계좌를 잠그므로 인증 실패는 절대 재시도하지 않음
+# 재시도는 시간초과 / 연결 끊김 같은 일시적인 에러만 (같은 입력으로 다시 해도 같은 결과인 에러는 바로 실패 처리)
+
+# 인증정보 오류로 보는 은행 경고 메시지 키워드
+LOGIN_ERROR_KEYWORDS = ('비밀번호', '생년월일', '주민등록번호', '사업자등록번호', '계좌번호', '오류횟수', '오류 횟수', '인증')
+
+# 일시적인 에러로 보는 예외 클래스 이름 (selenium / requests / paramiko 를 import 하지 않고 판단)
+TRANSIENT_ERROR_NAMES = {
+    'TimeoutException', 'InvalidSessionIdException',       # selenium
+    'ReadTimeout', 'ConnectTimeout', 'ChunkedEncodingError',  # requests
+    'SSHException', 'NoValidConnectionsError',              # paramiko
+}
+TRANSIENT_ERROR_TYPES = (TimeoutError, ConnectionError, EOFError)
+
+ALERT_PATTERN = re.compile(r"alert\(\s*(['\"])(.+?)\1\s*\)")
+
+
+class BankLoginError(RuntimeError):
+    """은행이 인증정보(비밀번호, 생년월일 등)를 거부함 - 재시도하면 계좌 잠금 위험"""
+
+
+def is_login_error_message(message):
+    return any(keyword in (message or '') for keyword in LOGIN_ERROR_KEYWORDS)
+
+
+def bank_alert_error(message):
+    """은행 경고창 메시지를 에러로 변환 (인증 오류면 BankLoginError)"""
+    if is_login_error_message(message):
+        return BankLoginError(f"은행 인증 실패: {message}")
+    return RuntimeError(f"은행 경고: {message}")
+
+
+def find_alert_message(html):
+    """HTTP 응답 스크립트의 alert('...') 메시지 (없으면 None)"""
+    match = ALERT_PATTERN.search(html or '')
+    return match.group(2) if match else None
+
+
+def is_transient_error(error):
+    """다시 시도하면 성공할 수 있는 에러인지 (인증 실패는 항상 False)"""
+    if isinstance(error, BankLoginError):
+        return False
+    if isinstance(error, TRANSIENT_ERROR_TYPES):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
@@ -0,0 +1,164 @@
+import argparse
+import importlib
+import logging
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Mapping
+
+# 은행별 조회 모듈 레지스트리
+# 은행 모듈(selenium, pandas, pyautogui 등 무거운 의존성 포함)은 해당 은행 요청이 처음 들어올 때 import 후 캐시
+# 새 은행 추가 시 BANK_MANIFEST 에 한 항목만 추가하면 됨
+#   entry_points: 종류 → 'module:함수명'
+#     personal / corp             : 엑셀 (원본, 업로드용) 반환
+#     personal_rows               : (headers, rows) 반환 (거래내역 캐시용)
+#     personal_http / *_http_rows : 브라우저 없는 HTTP 엔진
+#     is_descending               : 조회결과 정렬 방향 판단 함수
+#     upload_transform            : 원본 엑셀 → 업로드 양식 DataFrame (은행별 기존 변환 함수)
+#   capabilities: 워커가 분기에 참고하는 기능 목록 (모듈 import 없이 확인 가능, main.run_bank_function 등)
+#     http_engine       : BANK_ENGINES 가 'http' 일 때 personal_http* 함수 사용
+#     session_pool      : 세션풀 드라이버를 driver 인자로 받음
+#     transaction_cache : 조회한 행을 거래내역 캐시에 저장 / 재사용
+
+BANK_MANIFEST = {
+    'BANK001': {
+        'name': '농협은행',
+        'entry_points': {
+            'personal': 'NH_BANK:get_balance',
+            'personal_rows': 'NH_BANK:fetch_rows',
+            'personal_http': 'NH_BANK_HTTP:get_balance',
+            'personal_http_rows': 'NH_BANK_HTTP:fetch_rows',
+            'corp': 'NH_CORP_BANK:corp_get_balance',
+            'is_descending': 'NH_BANK:is_descending_by_date',
+            'upload_transform': 'NH_BANK:read_and_transform_downloaded_excel',
+        },
+        'capabilities': ('http_engine', 'transaction_cache', 'session_pool'),
+    },
+}
+
+
+class BankEntry(Mapping):
+    """은행 1곳의 함수 목록. 종류 확인(in)은 import 없이, 함수 조회 시 모듈을 import"""
+
+    def __init__(self, registry, bank_code, manifest):
+        self._registry = registry
+        self.bank_code = bank_code
+        self.name = manifest.get('name', bank_code)
+        self.entry_points = dict(manifest['entry_points'])
+        self.capabilities = frozenset(manifest.get('capabilities', ()))
+
+    def __getitem__(self, kind):
+        module_name, func_name = self.entry_points[kind].split(':')
+        return getattr(self._registry.load_module(module_name), func_name)
+
+    def __contains__(self, kind):
+        return kind in self.entry_points
+
+    def __iter__(self):
+        return iter(self.entry_points)
+
+    def __len__(self):
+        return len(self.entry_points)
+
+    def supports(self, capability):
+        return capability in self.capabilities
+
+
+class BankRegistry(Mapping):
+    """bank_functions 딕셔너리와 같은 방식(registry[bank_code][kind])으로 사용하는 지연 로딩 레지스트리"""
+
+    def __init__(self, manifest):
+        self._entries = {code: BankEntry(self, code, spec) for code, spec in manifest.items()}
+        self._modules = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, bank_code):
+        return self._entries[bank_code]
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load_module(self, module_name):
+        module = self._modules.get(module_name)
+        if module is not None:
+            return module
+        with self._lock:
+            if module_name not in self._modules:
+                start = time.perf_counter()
+                self._modules[module_name] = importlib.import_module(module_name)
+                logging.info(f"[은행 모듈 로드] {module_name} ({(time.perf_counter() - start) * 1000:.0f}ms)")
+            return self._modules[module_name]
+
+    def loaded_modules(self):
+        return sorted(self._modules)
+
+    def preload(self, bank_codes=None):
+        """지정한 은행(기본: 전체) 모듈을 미리 import. 실패한 모듈은 {모듈: 에러} 로 반환"""
+        errors = {}
+        for code in bank_codes or self._entries:
+            for target in self._entries[code].entry_points.values():
+                module_name = target.split(':')[0]
+                try:
+                    self.load_module(module_name)
+                except ImportError as e:
+                    errors[module_name] = e
+        return errors
+
+
+bank_functions = BankRegistry(BANK_MANIFEST)
+
+# 워커 기동 시 import 되면 안 되는 무거운 모듈 (첫 요청 처리 시 import)
+HEAVY_MODULES = ('pandas', 'openpyxl', 'bs4', 'lxml', 'paramiko', 'selenium', 'xlrd', 'python_calamine')
+
+
+def measure_startup(statement, runs):
+    """새 파이썬 프로세스에서 statement 실행에 걸린 시간(ms) 목록 (실패하면 RuntimeError)"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', statement], check=False,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        timings.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            last_line = (result.stderr.strip().splitlines() or ['(출력 없음)'])[-1]
+            raise RuntimeError(f"'{statement}' 실행 실패: {last_line}")
+    return timings
+
+
+def loaded_heavy_modules(statement):
+    """statement 실행 후 import 되어 있는 무거운 모듈 목록"""
+    probe = (f"{statement}; import sys; "
+             f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', probe], check=False, capture_output=True, text=True)
+    return [m for m in result.stdout.strip().split(',') if m] if result.returncode == 0 else None
+
+
+if __name__ == "__main__":
+    # 워커 기동 시간 비교: import main (은행 / 엑셀 모듈 지연 로딩) vs 모든 은행 모듈 즉시 import
+    # 사용 예) python bank_registry.py --runs 10
+    arg_parser = argparse.ArgumentParser(description="은행 모듈 지연 로딩 기동 시간 벤치마크")
+    arg_parser.add_argument('--runs', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    cases = [
+        ('lazy (import main)', "import main"),
+        ('eager (all banks)', "import main; main.bank_functions.preload()"),
+    ]
+    for label, statement in cases:
+        try:
+            timings = measure_startup(statement, args.runs)
+        except RuntimeError as e:
+            print(f"{label:<22} 측정 불가: {e}")
+            continue
+        print(f"{label:<22} median {statistics.median(timings):8.1f}ms  "
+              f"min {min(timings):8.1f}ms  max {max(timings):8.1f}ms  ({args.runs}회)")
+        print(f"{'':<22} 로드된 무거운 모듈: {', '.join(loaded_heavy_modules(statement) or []) or '-'}")
+
+    errors = bank_functions.preload()
+    for module_name, error in errors.items():
+        print(f"  import 실패 (이 환경에 의존성 없음): {module_name}: {error}")
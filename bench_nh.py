@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import metrics
+import mock_nh_server
+
+# 농협 빠른조회 오프라인 벤치마크 (로컬 모의 사이트 사용, 실제 은행 접속 없음)
+# 사용 예) python bench_nh.py --engine selenium --sizes 30,300,1500 --concurrency 1,2,4 --requests 4
+# 결과는 커밋 해시와 함께 --output 파일에 누적되며 --compare 로 이전 커밋 결과와 비교
+
+DEFAULT_DRIVER_PATH = r"C:\chromedriver-win64\chromedriver.exe"
+DEFAULT_OUTPUT = 'bench_results.jsonl'
+
+BENCH_ACCOUNT = '3020000000001'
+BENCH_PASSWORD = '1234'
+BENCH_BIRTHDAY = '900101'
+BENCH_START = datetime(2025, 1, 1)
+BENCH_END = datetime(2025, 12, 31)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+class PeakRssSampler(threading.Thread):
+    """현재 프로세스와 자식(chromedriver, chrome) 프로세스의 RSS 합계 최댓값 측정"""
+
+    def __init__(self, interval=0.2):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = None
+        self._stop_event = threading.Event()
+
+    def _current_rss(self):
+        try:
+            import psutil
+        except ImportError:
+            return None
+        proc = psutil.Process()
+        total = proc.memory_info().rss
+        for child in proc.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    def run(self):
+        while not self._stop_event.is_set():
+            rss = self._current_rss()
+            if rss is None:
+                return
+            self.peak = max(self.peak or 0, rss)
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return round(self.peak / 1024 / 1024, 1) if self.peak else None
+
+
+def make_selenium_runner(args, base_url, concurrency, work_dir):
+    import NH_BANK
+    from session_pool import DriverSessionPool
+
+    NH_BANK.NH_BANK_URL = base_url
+    if args.headless:
+        # pyautogui 는 화면에 떠 있는 창에만 입력 가능하므로 헤드리스에서는 DevTools 입력 사용
+        NH_BANK.INPUT_BACKEND = 'cdp'
+    pool = DriverSessionPool(
+        args.driver, os.path.join(work_dir, 'sessions'), size=concurrency,
+        driver_factory=lambda path, download_dir: NH_BANK.get_driver(path, download_dir, headless=args.headless)
+    )
+    with metrics.span('bench_warm_up'):
+        pool.warm_up()
+
+    def run_one(index):
+        download_dir = os.path.join(work_dir, f"req_{index}")
+        with pool.session(download_dir) as session:
+            NH_BANK.get_balance(args.driver, BENCH_ACCOUNT, BENCH_PASSWORD, BENCH_BIRTHDAY, BENCH_START, BENCH_END,
+                                download_dir, driver=session.driver, extract_mode=args.extract_mode, chunk_months=None)
+
+    return run_one, pool.close
+
+
+def make_http_runner(args, base_url, concurrency, work_dir):
+    import NH_BANK_HTTP
+
+    def run_one(index):
+        download_dir = os.path.join(work_dir, f"req_{index}")
+        with metrics.span('bank_function', engine='http'):
+            NH_BANK_HTTP.get_balance(None, BENCH_ACCOUNT, BENCH_PASSWORD, BENCH_BIRTHDAY, BENCH_START, BENCH_END,
+                                     download_dir, base_url=base_url)
+
+    return run_one, lambda: None
+
+
+def run_level(args, total_rows, concurrency):
+    server, base_url = mock_nh_server.start_mock_site(total_rows, args.page_size, args.latency)
+    work_dir = tempfile.mkdtemp(prefix='bench_nh_')
+    metrics.METRICS_PATH = os.path.join(work_dir, 'metrics.jsonl')
+
+    make_runner = make_selenium_runner if args.engine == 'selenium' else make_http_runner
+    sampler = PeakRssSampler()
+    sampler.start()
+    run_one, close = make_runner(args, base_url, concurrency, work_dir)
+
+    errors = 0
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(run_one, idx) for idx in range(args.requests)]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    errors += 1
+                    print(f"  요청 실패: {type(e).__name__}: {e}")
+        elapsed = time.perf_counter() - start
+    finally:
+        close()
+        server.shutdown()
+    peak_rss_mb = sampler.stop()
+
+    stages = {
+        row['stage']: {'count': row['count'], 'p50': row['p50'], 'p95': row['p95'], 'p99': row['p99']}
+        for row in metrics.summarize(metrics.load_events(metrics.METRICS_PATH))
+    } if os.path.exists(metrics.METRICS_PATH) else {}
+
+    completed = args.requests - errors
+    return {
+        'commit': git_commit(),
+        'ts': datetime.now().isoformat(timespec='seconds'),
+        'engine': args.engine,
+        'extract_mode': args.extract_mode,
+        'rows': total_rows,
+        'page_size': args.page_size,
+        'latency': args.latency,
+        'concurrency': concurrency,
+        'requests': args.requests,
+        'errors': errors,
+        'elapsed_s': round(elapsed, 2),
+        'requests_per_hour': round(completed / elapsed * 3600, 1) if elapsed else 0,
+        'peak_rss_mb': peak_rss_mb,
+        'stages': stages,
+    }
+
+
+def level_key(result):
+    return (result['engine'], result['extract_mode'], result['rows'], result['page_size'], result['concurrency'])
+
+
+def load_previous(path, commit):
+    """다른 커밋에서 측정한 같은 조건의 가장 최근 결과"""
+    previous = {}
+    if not os.path.exists(path):
+        return previous
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            result = json.loads(line)
+            if result['commit'] != commit:
+                previous[level_key(result)] = result
+    return previous
+
+
+def print_result(result, baseline=None):
+    line = (f"[{result['engine']}/{result['extract_mode']}] rows={result['rows']:>6} conc={result['concurrency']:>2} "
+            f"→ {result['requests_per_hour']:>9.1f} req/h, peak RSS {result['peak_rss_mb']} MB, errors {result['errors']}")
+    if baseline and baseline['requests_per_hour']:
+        delta = (result['requests_per_hour'] / baseline['requests_per_hour'] - 1) * 100
+        line += f" ({delta:+.1f}% vs {baseline['commit']})"
+    print(line)
+    for stage, values in sorted(result['stages'].items()):
+        print(f"    {stage:<24} p50 {values['p50']:>9.1f}ms  p95 {values['p95']:>9.1f}ms  p99 {values['p99']:>9.1f}ms")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="농협 빠른조회 오프라인 벤치마크")
+    arg_parser.add_argument('--engine', choices=['selenium', 'http'], default='selenium')
+    arg_parser.add_argument('--extract-mode', choices=['table', 'oz'], default='table',
+                            help="oz 는 오즈리포트 다운로드 헬퍼가 있는 환경에서만 동작")
+    arg_parser.add_argument('--sizes', default='30,300,1500', help="거래 건수 목록 (쉼표 구분)")
+    arg_parser.add_argument('--concurrency', default='1,2,4', help="동시 요청 수 목록 (쉼표 구분)")
+    arg_parser.add_argument('--requests', type=int, default=4, help="조건별 요청 수")
+    arg_parser.add_argument('--page-size', type=int, default=30)
+    arg_parser.add_argument('--latency', type=float, default=0.2, help="모의 사이트 조회 응답 지연(초)")
+    arg_parser.add_argument('--driver', default=DEFAULT_DRIVER_PATH)
+    arg_parser.add_argument('--headed', dest='headless', action='store_false', help="브라우저 창 표시")
+    arg_parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    arg_parser.add_argument('--compare', action='store_true', help="이전 커밋 결과와 비교 출력")
+    args = arg_parser.parse_args()
+
+    commit = git_commit()
+    previous = load_previous(args.output, commit) if args.compare else {}
+
+    for size in [int(v) for v in args.sizes.split(',')]:
+        for concurrency in [int(v) for v in args.concurrency.split(',')]:
+            result = run_level(args, size, concurrency)
+            print_result(result, previous.get(level_key(result)))
+            with open(args.output, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(result, ensure_ascii=False) + '\n')
@@ -0,0 +1,82 @@
+import logging
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from waits import element_focused, value_accepted, wait_until
+
+# DevTools 프로토콜(Input 도메인)로 대상 요소에 직접 키 입력
+# OS 키보드/창 포커스가 필요 없어 헤드리스 및 여러 브라우저 동시 실행에서도 동작하며,
+# 브라우저 입력 파이프라인을 거치므로 페이지에서는 실제 키 입력(isTrusted)으로 처리됨
+
+SPECIAL_KEYS = {
+    'Backspace': {'key': 'Backspace', 'code': 'Backspace', 'windowsVirtualKeyCode': 8},
+    'End': {'key': 'End', 'code': 'End', 'windowsVirtualKeyCode': 35},
+}
+MODIFIER_SHIFT = 8
+
+
+def _char_key_params(ch):
+    if ch.isdigit():
+        return {'key': ch, 'code': f'Digit{ch}', 'windowsVirtualKeyCode': ord(ch)}
+    if ch.isalpha() and ch.isascii():
+        params = {'key': ch, 'code': f'Key{ch.upper()}', 'windowsVirtualKeyCode': ord(ch.upper())}
+        if ch.isupper():
+            params['modifiers'] = MODIFIER_SHIFT
+        return params
+    return {'key': ch}
+
+
+def press_key(driver, name):
+    params = SPECIAL_KEYS[name]
+    driver.execute_cdp_cmd('Input.dispatchKeyEvent', {'type': 'rawKeyDown', **params})
+    driver.execute_cdp_cmd('Input.dispatchKeyEvent', {'type': 'keyUp', **params})
+
+
+def send_text(driver, text):
+    """한 글자씩 keyDown(text 포함) / keyUp 이벤트 전송 (키 이벤트를 감시하는 보안 입력창 대응)"""
+    for ch in text:
+        params = _char_key_params(ch)
+        driver.execute_cdp_cmd('Input.dispatchKeyEvent', {'type': 'keyDown', 'text': ch, 'unmodifiedText': ch, **params})
+        driver.execute_cdp_cmd('Input.dispatchKeyEvent', {'type': 'keyUp', **params})
+
+
+def insert_text(driver, text):
+    """IME 확정 입력처럼 한 번에 삽입 (키 이벤트 없이 input 이벤트만 발생)"""
+    driver.execute_cdp_cmd('Input.insertText', {'text': text})
+
+
+def clear_focused_input(driver, element):
+    length = len(element.get_attribute('value') or '')
+    if length:
+        press_key(driver, 'End')
+        for _ in range(length):
+            press_key(driver, 'Backspace')
+
+
+def type_with_cdp(selector, text, driver, timeout=15, retries=3, is_secure=False, mode='keys'):
+    """type_with_keyboard 와 같은 검증/재시도 방식의 DevTools 입력 (mode: 'keys' 또는 'insert')"""
+    element = WebDriverWait(driver, timeout).until(EC.element_to_be_clickable((By.CSS_SELECTOR, selector)))
+
+    for attempt in range(retries):
+        driver.execute_script("arguments[0].scrollIntoView({block: 'center'}); arguments[0].focus();", element)
+        if not wait_until(driver, element_focused(element), timeout=3, description=f"{selector} 포커스",
+                          raise_on_timeout=False):
+            element.click()
+
+        if not is_secure:
+            clear_focused_input(driver, element)
+
+        if mode == 'insert':
+            insert_text(driver, text)
+        else:
+            send_text(driver, text)
+
+        if is_secure:
+            return True
+        if wait_until(driver, value_accepted(element, text), timeout=3,
+                      description=f"{selector} 입력값 확인", raise_on_timeout=False):
+            return True
+        logging.warning(f"[CDP 입력 재시도] {selector} ({attempt + 1}/{retries})")
+    raise ValueError(f"입력 실패 [{selector}]")
@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+from bank_errors import is_transient_error
+from excel_stream import new_buffer
+
+# 요청(REQ_SEQ)별 단계 결과 체크포인트
+# 업로드 실패 등으로 재시도할 때 이미 끝난 단계(조회, 엑셀 생성, 완료된 업로드)는 건너뛰고 이어서 실행
+# 기본은 메모리에만 보관 (같은 워커 안의 자동 재시도),
+# persist_dir 지정 시(디버그/보관 설정) 디스크에도 저장해 워커 재시작 후 같은 요청을 다시 받으면 이어서 실행
+
+MANIFEST_FILE = 'manifest.json'
+
+
+def _encode(value, directory, stage):
+    """JSON 으로 저장할 수 없는 메모리 버퍼는 파일로 저장하고 참조만 기록"""
+    if hasattr(value, 'getvalue'):
+        filename = f"{stage}_{os.path.basename(value.name)}"
+        with open(os.path.join(directory, filename), 'wb') as f:
+            f.write(value.getvalue())
+        return {'__buffer__': filename, 'name': value.name}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item, directory, f"{stage}_{idx}") for idx, item in enumerate(value)]
+    return value
+
+
+def _decode(value, directory):
+    if isinstance(value, dict) and '__buffer__' in value:
+        buffer = new_buffer(value['name'])
+        with open(os.path.join(directory, value['__buffer__']), 'rb') as f:
+            buffer.write(f.read())
+        buffer.seek(0)
+        return buffer
+    if isinstance(value, list):
+        return [_decode(item, directory) for item in value]
+    return value
+
+
+class Checkpoint:
+    def __init__(self, req_seq, persist_dir=None):
+        self.req_seq = req_seq
+        self.persist_dir = persist_dir
+        self._results = {}
+        self._uploaded = set()
+        self._lock = threading.Lock()
+        if persist_dir:
+            self._load()
+
+    def _manifest_path(self):
+        return os.path.join(self.persist_dir, MANIFEST_FILE)
+
+    def _load(self):
+        path = self._manifest_path()
+        if not os.path.exists(path):
+            return
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        self._results = {stage: _decode(value, self.persist_dir) for stage, value in manifest['stages'].items()}
+        self._uploaded = set(manifest['uploaded'])
+        logging.info(f"[체크포인트] REQ_SEQ={self.req_seq} 이전 실행 결과 로드: {self.completed()}")
+
+    def _save(self):
+        if not self.persist_dir:
+            return
+        os.makedirs(self.persist_dir, exist_ok=True)
+        manifest = {
+            'stages': {stage: _encode(value, self.persist_dir, stage) for stage, value in self._results.items()},
+            'uploaded': sorted(self._uploaded),
+        }
+        with open(self._manifest_path(), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+    def completed(self):
+        return list(self._results) + ([f"upload x{len(self._uploaded)}"] if self._uploaded else [])
+
+    def run(self, stage, func):
+        """완료된 단계면 저장된 결과를, 아니면 func() 실행 후 결과를 저장해 반환"""
+        if stage in self._results:
+            logging.info(f"[체크포인트] REQ_SEQ={self.req_seq} '{stage}' 단계 건너뜀 (이전 결과 사용)")
+            return self._results[stage]
+        result = func()
+        with self._lock:
+            self._results[stage] = result
+            self._save()
+        return result
+
+    def get(self, stage, default=None):
+        """완료된 단계 결과 조회 (실행하지 않음)"""
+        return self._results.get(stage, default)
+
+    def is_uploaded(self, remote_path):
+        return remote_path in self._uploaded
+
+    def mark_uploaded(self, remote_path):
+        with self._lock:
+            self._uploaded.add(remote_path)
+            self._save()
+
+    def clear(self):
+        self._results.clear()
+        self._uploaded.clear()
+        if self.persist_dir:
+            shutil.rmtree(self.persist_dir, ignore_errors=True)
+
+
+def run_with_retries(func, checkpoint, max_attempts=3, retry_delay=5, describe_error=str,
+                     should_retry=is_transient_error):
+    """func() 를 최대 max_attempts 번 실행. 실패해도 checkpoint 에 남은 단계부터 이어서 재시도
+    재시도는 should_retry(에러) 가 True 인 일시적 에러만 (인증 실패 등은 다시 로그인하지 않고 바로 실패)"""
+    for attempt in range(1, max_attempts + 1):
+        try:
+            return func()
+        except Exception as e:
+            if attempt >= max_attempts or not should_retry(e):
+                raise
+            logging.warning(f"[재시도 {attempt}/{max_attempts - 1}] REQ_SEQ={checkpoint.req_seq} "
+                            f"완료 단계 {checkpoint.completed()} 이후부터 재개: {describe_error(e)}")
+            time.sleep(retry_delay)
@@ -0,0 +1,97 @@
+import logging
+import re
+import threading
+from datetime import datetime, timedelta
+
+from bank_errors import is_transient_error
+from transaction_cache import date_column_index, parse_row_date
+
+# 같은 계좌 / 겹치는 조회기간 요청 묶음 처리
+# 같은 병원의 여러 사용자가 몇 분 사이에 같은 계좌를 조회하는 경우가 많아,
+# 기간 합집합을 한 번만 조회한 뒤 요청별 기간으로 잘라 각각 엑셀 생성 / 상태 갱신
+
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def coalesce_key(request):
+    """묶음 기준: 은행, 계좌, 계좌구분 + 인증정보 (인증정보가 다르면 다른 요청의 실패가 옮겨가지 않도록 분리)"""
+    return (
+        request['BANK_SE'],
+        re.sub(r'\D', '', request['ACCOUNT'] or ''),
+        request['ACCOUNT_SE'],
+        request['ACCOUNT_PW'],
+        request.get('ACCOUNT_PW2'),
+        request.get('RPRSNTV_BRTHDY'),
+        request.get('BIZRNO'),
+    )
+
+
+def request_range(request):
+    return (datetime.strptime(request['SCH_BGNDE'], DATE_FORMAT),
+            datetime.strptime(request['SCH_ENDDE'], DATE_FORMAT))
+
+
+def group_overlapping(requests):
+    """조회기간이 겹치거나 맞닿는 요청끼리 묶음 (REQ_SEQ 순서 유지)"""
+    groups = []
+    for request in sorted(requests, key=lambda r: (request_range(r)[0], r['REQ_SEQ'])):
+        start, end = request_range(request)
+        if groups and start <= groups[-1]['end'] + timedelta(days=1):
+            groups[-1]['requests'].append(request)
+            groups[-1]['end'] = max(groups[-1]['end'], end)
+        else:
+            groups.append({'start': start, 'end': end, 'requests': [request]})
+    return [sorted(group['requests'], key=lambda r: r['REQ_SEQ']) for group in groups]
+
+
+def union_range(requests):
+    ranges = [request_range(r) for r in requests]
+    return min(start for start, _ in ranges), max(end for _, end in ranges)
+
+
+def filter_rows_by_date(headers, rows, start_date, end_date):
+    """요청 기간에 해당하는 행만 원래 순서대로 반환"""
+    date_idx = date_column_index(headers)
+    start_str, end_str = start_date.strftime(DATE_FORMAT), end_date.strftime(DATE_FORMAT)
+    filtered = []
+    for row in rows:
+        tx_date = parse_row_date(row[date_idx]) if len(row) > date_idx else None
+        if tx_date is None:
+            logging.warning(f"[요청 묶음] 날짜를 알 수 없는 행 제외: {row}")
+            continue
+        if start_str <= tx_date <= end_str:
+            filtered.append(row)
+    return filtered
+
+
+class SharedScrape:
+    """묶음의 합집합 기간을 첫 요청에서 한 번만 조회하고, 이후 요청은 결과를 잘라 재사용
+    조회 실패는 묶음 전체에서 max_attempts 회까지만 다시 시도하고, 이후에는 같은 에러를 모든 요청에 전달
+    (인증 실패 등 일시적이지 않은 에러는 다시 조회하지 않음 - 같은 인증정보로 재로그인하면 계좌 잠금 위험)"""
+
+    def __init__(self, start_date, end_date, max_attempts=3):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.max_attempts = max_attempts
+        self._result = None
+        self._error = None
+        self._attempts = 0
+        self._lock = threading.Lock()
+
+    def rows_for(self, start_date, end_date, fetch_range):
+        """fetch_range(시작일, 종료일) -> (headers, rows)"""
+        with self._lock:
+            if self._result is None and self._attempts < self.max_attempts:
+                self._attempts += 1
+                try:
+                    self._result = fetch_range(self.start_date, self.end_date)
+                except Exception as e:
+                    self._error = e
+                    if not is_transient_error(e):
+                        self._attempts = self.max_attempts
+                    raise
+        if self._result is None:
+            raise self._error
+
+        headers, rows = self._result
+        return headers, filter_rows_by_date(headers, rows, start_date, end_date)
@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import queue
+import re
+import time
+
+from metrics import span
+
+# 크롬 다운로드 완료 감지
+# 1) DevTools 다운로드 이벤트(downloadWillBegin / downloadProgress)를 performance 로그로 받아
+#    이번 요청에서 시작된 다운로드의 guid 로 정확한 파일을 찾음 (get_driver 의 goog:loggingPrefs 필요)
+# 2) 이벤트를 받을 수 없으면 watchdog(inotify 등) 파일 생성 감시, 설치되지 않았으면 폴더 폴링
+#    이벤트 모드에서도 EVENT_GRACE 초 동안 다운로드 이벤트가 없으면(팝업 창 다운로드 등) 파일 감시로 전환하고,
+#    guid 이름으로 저장된 파일은 원래 파일명(모르면 파일 내용으로 확장자 판단)으로 변경
+# 요청별 다운로드 폴더를 쓰므로 기존 파일을 지우지 않고 시작 시점의 파일 목록과 비교
+
+PARTIAL_SUFFIXES = ('.crdownload', '.tmp', '.part')
+DOWNLOAD_TIMEOUT = 60
+POLL_INTERVAL = 0.2
+EVENT_GRACE = 5
+STABLE_CHECKS = 3  # 파일 감시로 찾은 파일은 크기가 연속 N회 같아야 완료로 판단
+
+GUID_PATTERN = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
+MAGIC_EXTENSIONS = (
+    (b'\xd0\xcf\x11\xe0', '.xls'),
+    (b'PK\x03\x04', '.xlsx'),
+)
+
+
+def set_download_behavior(driver, download_dir, name_by_guid=False):
+    """브라우저 전체(팝업 창 포함) 다운로드 경로 지정 및 다운로드 이벤트 활성화"""
+    os.makedirs(download_dir, exist_ok=True)
+    driver.execute_cdp_cmd('Browser.setDownloadBehavior', {
+        'behavior': 'allowAndName' if name_by_guid else 'allow',
+        'downloadPath': download_dir,
+        'eventsEnabled': True,
+    })
+
+
+def read_download_events(driver):
+    """performance 로그에서 다운로드 이벤트만 추출 (Browser.* / Page.* 모두 처리)"""
+    events = []
+    for entry in driver.get_log('performance'):
+        message = json.loads(entry['message'])['message']
+        method = message.get('method', '')
+        if method.endswith('.downloadWillBegin') or method.endswith('.downloadProgress'):
+            events.append((method.split('.', 1)[1], message.get('params', {})))
+    return events
+
+
+def is_complete_file(path):
+    return os.path.isfile(path) and not path.endswith(PARTIAL_SUFFIXES)
+
+
+def guess_extension(path):
+    """파일 앞부분(매직 바이트)으로 엑셀 확장자 추정 (모르면 빈 문자열)"""
+    with open(path, 'rb') as f:
+        head = f.read(8)
+    for magic, ext in MAGIC_EXTENSIONS:
+        if head.startswith(magic):
+            return ext
+    return ''
+
+
+def wait_for_stable_size(path, deadline):
+    """이름만으로 완료 여부를 알 수 없는 파일(guid 이름)은 크기가 변하지 않을 때까지 대기"""
+    last_size, stable = None, 0
+    while time.monotonic() < deadline:
+        size = os.path.getsize(path)
+        stable = stable + 1 if size == last_size and size > 0 else 0
+        if stable >= STABLE_CHECKS:
+            return path
+        last_size = size
+        time.sleep(POLL_INTERVAL)
+    raise TimeoutError(f"다운로드 파일 크기가 안정되지 않음: {path}")
+
+
+def unique_path(download_dir, filename):
+    base, ext = os.path.splitext(filename)
+    path = os.path.join(download_dir, filename)
+    counter = 1
+    while os.path.exists(path):
+        path = os.path.join(download_dir, f"{base} ({counter}){ext}")
+        counter += 1
+    return path
+
+
+class DownloadTracker:
+    """요청 1건의 다운로드를 추적해 완료되는 즉시 파일 경로 반환
+
+    tracker = DownloadTracker(driver, download_dir)
+    tracker.start()          # 다운로드 버튼 클릭 전에 호출
+    ...
+    path = tracker.wait()
+    """
+
+    def __init__(self, driver, download_dir):
+        self.driver = driver
+        self.download_dir = download_dir
+        self.use_events = False
+        self._before = set()
+        self._names = {}
+
+    def start(self):
+        try:
+            self.driver.get_log('performance')  # 이전 요청의 로그 비우기
+            self.use_events = True
+        except Exception as e:
+            logging.info(f"[다운로드] DevTools 이벤트 사용 불가 → 파일 감시로 대체 ({e})")
+            self.use_events = False
+
+        # 이벤트를 받을 때는 guid 이름으로 저장해 다른 다운로드와 섞이지 않게 함
+        set_download_behavior(self.driver, self.download_dir, name_by_guid=self.use_events)
+        self._before = set(os.listdir(self.download_dir))
+        return self
+
+    def wait(self, timeout=DOWNLOAD_TIMEOUT):
+        with span('download_wait', source='cdp' if self.use_events else 'fs'):
+            if self.use_events:
+                return self._wait_for_event(timeout)
+            return wait_for_new_file(self.download_dir, self._before, timeout)
+
+    def _wait_for_event(self, timeout):
+        deadline = time.monotonic() + timeout
+        last_event = time.monotonic()
+        while time.monotonic() < deadline:
+            events = read_download_events(self.driver)
+            if events:
+                last_event = time.monotonic()
+            elif time.monotonic() - last_event >= EVENT_GRACE:
+                # 다운로드 이벤트가 오지 않는 대상(팝업 창 등) → 파일 감시로 나머지 시간 대기
+                logging.info(f"[다운로드] {EVENT_GRACE}초간 이벤트 없음 → 파일 감시로 대체")
+                path = wait_for_new_file(self.download_dir, self._before, deadline - time.monotonic())
+                return self._finalize_file(wait_for_stable_size(path, deadline))
+            for kind, params in events:
+                guid = params.get('guid')
+                if kind == 'downloadWillBegin':
+                    self._names[guid] = params.get('suggestedFilename') or guid
+                    logging.info(f"[다운로드] 시작: {self._names[guid]}")
+                elif guid in self._names and params.get('state') == 'completed':
+                    return self._finalize(guid)
+                elif guid in self._names and params.get('state') == 'canceled':
+                    raise RuntimeError(f"다운로드 취소됨: {self._names[guid]}")
+            time.sleep(POLL_INTERVAL)
+        raise TimeoutError(f"다운로드 완료 이벤트 없음 ({timeout}초): {self.download_dir}")
+
+    def _finalize(self, guid):
+        """guid 이름으로 저장된 파일을 원래 파일명으로 변경"""
+        source = os.path.join(self.download_dir, guid)
+        target = unique_path(self.download_dir, self._names[guid])
+        os.replace(source, target)
+        logging.info(f"[다운로드] 완료: {target}")
+        return target
+
+    def _finalize_file(self, path):
+        """파일 감시로 찾은 파일이 guid 이름이면 원래 파일명(이벤트로 받은 이름 또는 내용으로 추정한 확장자)으로 변경"""
+        guid = os.path.basename(path)
+        if guid in self._names:
+            return self._finalize(guid)
+        if not GUID_PATTERN.match(guid):
+            return path
+        target = unique_path(self.download_dir, guid + guess_extension(path))
+        os.replace(path, target)
+        logging.info(f"[다운로드] 완료: {target}")
+        return target
+
+
+def _new_complete_files(download_dir, before):
+    return [
+        os.path.join(download_dir, name) for name in os.listdir(download_dir)
+        if name not in before and is_complete_file(os.path.join(download_dir, name))
+    ]
+
+
+def wait_for_new_file(download_dir, before, timeout=DOWNLOAD_TIMEOUT):
+    """시작 이후 새로 생긴 완성 파일 반환 (watchdog 이 있으면 파일 시스템 알림, 없으면 폴링)"""
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        Observer = None
+
+    deadline = time.monotonic() + timeout
+    if Observer is None:
+        while time.monotonic() < deadline:
+            found = _new_complete_files(download_dir, before)
+            if found:
+                return found[0]
+            time.sleep(POLL_INTERVAL)
+        raise TimeoutError(f"다운로드 파일 없음 ({timeout}초): {download_dir}")
+
+    changed = queue.Queue()
+
+    class _Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            changed.put(event)
+
+    observer = Observer()
+    observer.schedule(_Handler(), download_dir, recursive=False)
+    observer.start()
+    try:
+        while True:
+            # 감시 시작 전에 끝난 다운로드도 놓치지 않도록 알림마다 폴더 재확인
+            found = _new_complete_files(download_dir, before)
+            if found:
+                return found[0]
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"다운로드 파일 없음 ({timeout}초): {download_dir}")
+            try:
+                changed.get(timeout=remaining)
+            except queue.Empty:
+                pass
+    finally:
+        observer.stop()
+        observer.join()
@@ -0,0 +1,256 @@
+import io
+import logging
+import os
+from datetime import datetime
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+from nh_parser import COLUMN_KEYWORDS, find_column, rows_to_dataframe
+
+# 대용량 거래내역을 행 단위로 읽고 write-only 모드로 저장해 메모리 사용량을 일정하게 유지
+# 업로드용 엑셀의 양식(컬럼 구성)은 은행 모듈의 기존 변환 함수(upload_transform)가 그대로 결정하고,
+# 여기서는 원본을 읽고 쓰는 방식과 결과 저장 방식만 담당
+# 메모리 사용량이 일정한 것은 원본 엑셀 기록까지 - 업로드용 엑셀은 기존 변환 함수가 원본 전체를 DataFrame 으로 읽으므로
+# 최대 메모리가 거래 건수에 비례 (변환 함수를 행 단위로 바꾸기 전까지는 양식 유지를 우선)
+CHUNK_SIZE = 5000
+
+# 결과 엑셀은 메모리 버퍼로 만들어 바로 업로드하고, 디버그/보관용으로만 로컬 파일 유지
+KEEP_LOCAL_FILES = os.environ.get('BANK_KEEP_LOCAL_FILES', '0') == '1'
+
+OLE_MAGIC = b'\xd0\xcf\x11\xe0'
+
+# 조회결과 테이블(텍스트)로 만든 원본 엑셀도 오즈리포트 엑셀처럼 금액은 숫자, 거래일시는 날짜 셀로 기록
+AMOUNT_COLUMNS = ('출금금액', '입금금액', '거래후잔액')
+DATE_COLUMNS = ('거래일시',)
+
+
+def new_buffer(name):
+    """파일명(확장자 판단용)을 가진 메모리 버퍼"""
+    buffer = io.BytesIO()
+    buffer.name = name
+    return buffer
+
+
+def result_name(result):
+    """결과가 파일 경로든 메모리 버퍼든 파일명 반환"""
+    if isinstance(result, (bytes, bytearray)):
+        return '(memory)'
+    return getattr(result, 'name', result)
+
+
+def is_xls_file(source):
+    """확장자와 무관하게 파일 시그니처로 구형 xls 여부 판단 (경로 또는 bytes)"""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source[:4]) == OLE_MAGIC
+    with open(source, 'rb') as f:
+        return f.read(4) == OLE_MAGIC
+
+
+def iter_sheet_rows(source):
+    """첫 시트의 행을 튜플로 하나씩 반환 (source: 파일 경로 또는 다운로드한 bytes)"""
+    if is_xls_file(source):
+        yield from _iter_xls_rows(source)
+        return
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield row
+    finally:
+        workbook.close()
+
+
+def _iter_xls_rows(source):
+    """구형 xls(BIFF)는 행 단위로 읽을 수 없어 시트를 한 번에 읽어야 함
+    python-calamine 이 있으면 셀을 Rust 쪽 압축 배열로 두고 한 행씩만 파이썬 객체로 변환,
+    없으면 xlrd (모든 셀을 파이썬 객체로 올리므로 큰 파일은 메모리 사용량이 큼)"""
+    try:
+        from python_calamine import CalamineWorkbook
+    except ImportError:
+        CalamineWorkbook = None
+
+    if CalamineWorkbook is not None:
+        if isinstance(source, (bytes, bytearray)):
+            workbook = CalamineWorkbook.from_filelike(io.BytesIO(source))
+        else:
+            workbook = CalamineWorkbook.from_path(source)
+        for row in workbook.get_sheet_by_index(0).iter_rows():
+            yield tuple(None if cell == '' else cell for cell in row)
+        return
+
+    logging.info("[엑셀] python-calamine 미설치 → xlrd 로 xls 전체를 읽음")
+    import xlrd
+    if isinstance(source, (bytes, bytearray)):
+        book = xlrd.open_workbook(file_contents=bytes(source), on_demand=True)
+    else:
+        book = xlrd.open_workbook(source, on_demand=True)
+    try:
+        sheet = book.sheet_by_index(0)
+        for idx in range(sheet.nrows):
+            yield tuple(sheet.row_values(idx))
+    finally:
+        book.release_resources()
+
+
+def is_header_row(row):
+    keywords = [kw for _, kws in COLUMN_KEYWORDS for kw in kws]
+    matched = sum(1 for cell in row if cell is not None and any(kw in str(cell) for kw in keywords))
+    return matched >= 2
+
+
+def iter_row_chunks(source, chunk_size=CHUNK_SIZE):
+    """(헤더, 행 묶음) 을 chunk_size 단위로 반환. 헤더 위의 제목 행은 건너뜀"""
+    header = None
+    chunk = []
+    yielded = False
+    for row in iter_sheet_rows(source):
+        if header is None:
+            if is_header_row(row):
+                header = [str(cell).strip() if cell is not None else '' for cell in row]
+            continue
+        if not any(cell not in (None, '') for cell in row):
+            continue
+        row = tuple(row[:len(header)])
+        chunk.append(row + (None,) * (len(header) - len(row)))
+        if len(chunk) >= chunk_size:
+            yield header, chunk
+            yielded = True
+            chunk = []
+
+    if header is None:
+        raise ValueError(f"거래내역 헤더 행을 찾을 수 없습니다: {result_name(source)}")
+    if chunk or not yielded:
+        yield header, chunk
+
+
+def _cell_value(value):
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, float) and pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value
+
+
+class StreamingXlsxWriter:
+    """openpyxl write-only 워크북에 행을 이어서 기록 (path 는 파일 경로 또는 new_buffer 버퍼)"""
+
+    def __init__(self, path, header):
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet()
+        self.sheet.append(list(header))
+        self.rows = 0
+
+    def append_rows(self, rows):
+        for row in rows:
+            self.sheet.append([_cell_value(v) for v in row])
+            self.rows += 1
+
+    def append_dataframe(self, df):
+        self.append_rows(df.itertuples(index=False, name=None))
+
+    def close(self):
+        self.workbook.save(self.path)
+        if hasattr(self.path, 'seek'):
+            self.path.seek(0)
+        return self.path
+
+
+def _parse_date_cell(value):
+    from transactions import parse_tx_datetime
+
+    if value in (None, ''):
+        return None
+    parsed = parse_tx_datetime(value)
+    if parsed is None:
+        raise ValueError(f"거래일시 형식 오류: {value!r}")
+    return parsed
+
+
+def typed_cell_converters(headers):
+    """컬럼 위치 → 셀 변환 함수 (금액: 정수, 거래일시: datetime)"""
+    from transactions import parse_amount
+
+    keywords = dict(COLUMN_KEYWORDS)
+    converters = {}
+    for targets, convert in ((AMOUNT_COLUMNS, parse_amount), (DATE_COLUMNS, _parse_date_cell)):
+        for target in targets:
+            column = find_column(headers, keywords[target])
+            if column is not None:
+                converters[list(headers).index(column)] = convert
+    return converters
+
+
+def to_typed_dataframe(headers, rows, converters):
+    """헤더 / 셀 수를 검증한 DataFrame 에서 금액 / 거래일시 컬럼을 숫자 / 날짜 값으로 변환"""
+    df = rows_to_dataframe(headers, rows)
+    for idx, convert in converters.items():
+        df.iloc[:, idx] = [convert(value) for value in df.iloc[:, idx]]
+    return df
+
+
+def write_rows_xlsx(path, header, rows):
+    writer = StreamingXlsxWriter(path, header)
+    writer.append_rows(rows)
+    return writer.close()
+
+
+def transform_upload_workbook(original, upload_dest, transform):
+    """기존 업로드 변환 함수(원본 엑셀 → DataFrame) 결과를 write-only 모드로 저장
+    original / upload_dest 는 경로 또는 new_buffer 버퍼
+    transform 이 원본 전체를 DataFrame 으로 읽으므로 이 단계의 메모리는 거래 건수에 비례 (저장만 write-only)"""
+    if hasattr(original, 'seek'):
+        original.seek(0)
+    upload_df = transform(original)
+    if hasattr(original, 'seek'):
+        original.seek(0)
+
+    writer = StreamingXlsxWriter(upload_dest, upload_df.columns)
+    writer.append_dataframe(upload_df)
+    del upload_df  # 저장 전에 DataFrame 해제 (워크북 직렬화와 겹치지 않도록)
+    writer.close()
+    logging.info(f"[업로드 양식 변환] {result_name(original)} → {result_name(upload_dest)} ({writer.rows}행)")
+    return upload_dest
+
+
+def write_transaction_workbooks(headers, rows, download_dir, transform, prefix='NH_Transactions', keep_local=None):
+    """원본 / 업로드용 엑셀 쌍 생성. keep_local 이면 파일 경로, 아니면 메모리 버퍼 반환"""
+    return write_transaction_workbooks_stream([(headers, rows)], download_dir, transform, prefix, keep_local)
+
+
+def write_transaction_workbooks_stream(pages, download_dir, transform, prefix='NH_Transactions', keep_local=None):
+    """(headers, rows) 페이지를 받는 대로 원본 엑셀에 이어서 기록 (전체 행을 모아두지 않음)
+    업로드용 엑셀은 완성된 원본을 transform(은행 모듈의 기존 변환 함수)으로 변환해 생성"""
+    keep_local = KEEP_LOCAL_FILES if keep_local is None else keep_local
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    if keep_local:
+        os.makedirs(download_dir, exist_ok=True)
+        xlsx_filename = os.path.join(download_dir, f'{prefix}_{timestamp}.xlsx')
+        upload_xlsx_filename = os.path.join(download_dir, f'{prefix}_{timestamp}_upload.xlsx')
+    else:
+        xlsx_filename = new_buffer(f'{prefix}_{timestamp}.xlsx')
+        upload_xlsx_filename = new_buffer(f'{prefix}_{timestamp}_upload.xlsx')
+
+    original_writer = None
+    converters = None
+    for headers, rows in pages:
+        if original_writer is not None and not rows:
+            continue
+        if converters is None:
+            converters = typed_cell_converters(headers)
+        df = to_typed_dataframe(headers, rows, converters)
+        if original_writer is None:
+            original_writer = StreamingXlsxWriter(xlsx_filename, df.columns)
+        original_writer.append_dataframe(df)
+
+    if original_writer is None:
+        original_writer = StreamingXlsxWriter(xlsx_filename, [])
+    original_writer.close()
+
+    transform_upload_workbook(xlsx_filename, upload_xlsx_filename, transform)
+    return xlsx_filename, upload_xlsx_filename
@@ -1,87 +1,202 @@
 import time
 from datetime import datetime
 import os
-from db_connector import fetch_pending_requests, update_request_status
-from NH_BANK import get_balance as nh_personal
-from NH_CORP_BANK import corp_get_balance as nh_corp
+from db_connector import update_request_status
+from bank_registry import bank_functions
+from session_pool import DriverSessionPool
+from request_claims import AdaptiveBackoff, LeaseHeartbeat, PollingRequestQueue, RequestLeaseQueue, get_connection
+from coalesce import SharedScrape, coalesce_key, group_overlapping, union_range
+from scheduler import FairScheduler
+from metrics import request_context, span
+from bank_errors import BankLoginError
+# 엑셀 / 체크포인트 / 거래내역 캐시 / SFTP 모듈(pandas, openpyxl, bs4, paramiko 등)은 처음 쓰는 함수 안에서 import
+# (워커 기동 시간 단축 - python bank_registry.py 로 import main 시간 측정)
 
 import shutil
+import posixpath
 import binascii
 import logging
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import padding
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 import re
-import subprocess
-import getpass
-import paramiko
 import traceback
+import threading
+import socket
+import inspect
+from contextlib import contextmanager
+from functools import partial
 
 
 
 CHROME_DRIVER_PATH = r"C:\chromedriver-win64\chromedriver.exe"
 BASE_DOWNLOAD_DIR = r"C:\BankLedgers"
+SESSION_PROFILE_ROOT = r"C:\BankWorkerProfiles"
+
+# 동시 처리 워커 수 (워커마다 별도의 다운로드 폴더 사용)
+# 크롬은 세션풀이 관리하며 세션마다 별도의 프로필 / 다운로드 폴더로 실행 (워커 수만큼 미리 실행)
+NUM_WORKERS = int(os.environ.get('BANK_WORKERS', '1'))
+
+# 요청 간 재사용할 드라이버 세션 설정 (max_uses 도달 시 재생성)
+SESSION_MAX_USES = 20
+# 긴 기간 구간 병렬 조회에 쓸 여분 세션 수 (세션풀에 포함, 필요할 때 생성)
+# 여분 세션도 스케줄러의 은행별 동시 실행 / 속도 제한(BANK_CONCURRENCY 등)을 한 칸씩 차지하므로 한도를 넘지 않음
+CHUNK_EXTRA_SESSIONS = 2
+session_pool = None
+
+# 은행별 조회 엔진 ('http' 설정 시 HTTP 엔진 우선, 실패하면 selenium 으로 대체)
+# HTTP 엔진은 mock_nh_server 로만 검증됨 - 실패할 때마다 실제 은행에 로그인 실패가 1회 기록되므로
+# 실서버 검증 전까지는 selenium 만 사용
+BANK_ENGINES = {
+    'BANK001': 'selenium',
+}
+
+# 거래내역 로컬 캐시 (반복 조회 시 미조회 / 당일 구간만 새로 조회)
+# 병원 + 인증정보가 같은 요청만 캐시를 재사용하고, 저장 행은 암호화
+# 암호화 키는 환경변수 BANK_CACHE_KEY (64자리 hex, 32바이트) - 설정되지 않으면 캐시를 사용하지 않음
+TRANSACTION_CACHE_PATH = os.path.join(BASE_DOWNLOAD_DIR, 'transaction_cache.sqlite3')
+TRANSACTION_CACHE_KEY_ENV = 'BANK_CACHE_KEY'
+TRANSACTION_CACHE_RETENTION_DAYS = 90
+transaction_cache = None
+
+# SFTP 연결 유지 설정 (요청마다 새로 접속하지 않고 재사용)
+SFTP_POOL_SIZE = 2
+SFTP_KEEPALIVE = 30
+sftp_pool = None
+
+# 요청 일괄 점유(lease) 및 유휴 폴링 간격 설정
+CLAIM_BATCH_SIZE = 5
+LEASE_SECONDS = 600
+IDLE_MIN_DELAY = 1
+IDLE_MAX_DELAY = 30
+
+# 공정 스케줄러 (은행별 동시 실행 / 속도 제한, 병원 간 라운드로빈, 짧은 조회기간 우선)
+# 제한값은 scheduler.BANK_CONCURRENCY / BANK_RATE_PER_MINUTE 참고
+SCHEDULER_BACKLOG = 20  # 스케줄러에 미리 점유해 둘 최대 요청 묶음 수
+scheduler = None
+
+# 요청 단계별 체크포인트 / 자동 재시도 (보관 설정 시 체크포인트를 디스크에도 저장해 재시작 후 이어서 실행)
+REQUEST_MAX_ATTEMPTS = 3
+REQUEST_RETRY_DELAY = 5
+CHECKPOINT_ROOT = os.path.join(BASE_DOWNLOAD_DIR, 'checkpoints')
+
+# 원본 / 업로드용 xlsx 와 함께 올릴 추가 출력 형식 (parquet, csv)
+# 요청의 OUTPUT_FORMAT 컬럼(예: 'parquet,csv')이 있으면 그 값을, 없으면 기본값(환경변수 BANK_OUTPUT_FORMATS) 사용
+DEFAULT_OUTPUT_FORMATS = os.environ.get('BANK_OUTPUT_FORMATS', '')
+
+_sftp_pool_lock = threading.Lock()
 
 
 def extract_core_error_message(e):
     """핵심 에러 메시지 추출"""
     return f"{type(e).__name__}: {str(e)}"
 
-def sftp_makedirs(sftp, remote_directory):
-    """원격 서버의 경로가 없으면 재귀적으로 디렉토리 생성"""
-    dirs = remote_directory.split('/')
-    path = ''
-    for dir_component in dirs:
-        if dir_component:
-            path += '/' + dir_component
-            try:
-                sftp.stat(path)
-            except FileNotFoundError:
-                sftp.mkdir(path)
+def get_sftp_pool():
+    """SFTP 연결 풀 (최초 사용 시 생성)"""
+    global sftp_pool
+    with _sftp_pool_lock:
+        if sftp_pool is None:
+            from sftp_pool import SFTPConnectionPool
 
-def upload_file_sftp(local_path, remote_path):
-    """SFTP를 통해 원격 서버에 파일 업로드"""
-    transport = paramiko.Transport((SFTP_HOST, SFTP_PORT))
-    transport.connect(username=SFTP_USER, password=SFTP_PASS)
-    sftp = paramiko.SFTPClient.from_transport(transport)
-
-    remote_directory = os.path.dirname(remote_path)
-    sftp_makedirs(sftp, remote_directory)  # 디렉토리 없으면 자동 생성
-
-    sftp.put(local_path, remote_path)
-    sftp.close()
-    transport.close()
+            sftp_pool = SFTPConnectionPool(
+                SFTP_HOST, SFTP_PORT, SFTP_USER, SFTP_PASS,
+                size=SFTP_POOL_SIZE, keepalive=SFTP_KEEPALIVE
+            )
+        return sftp_pool
 
+def upload_file_sftp(local_path, remote_path):
+    """SFTP를 통해 원격 서버에 파일 업로드 (디렉토리 없으면 자동 생성)"""
+    get_sftp_pool().upload(local_path, remote_path)
     logging.info(f"SFTP 업로드 완료: {local_path} → {remote_path}")
 
-def launch_chrome_with_debugging(user_data_dir=None, debugging_port=9222):
-    chrome_path = r'C:\Program Files\Google\Chrome\Application\chrome.exe'
-
-    subprocess.call('taskkill /f /t /im chrome.exe', shell=True)
-    subprocess.call('taskkill /f /t /im chromedriver.exe', shell=True)
-    time.sleep(2)
-
-    username = getpass.getuser()
-
-    if user_data_dir is None:
-        user_data_dir = rf"C:\Users\{username}\Desktop\chrome_selenium_profile"
-
-    os.makedirs(user_data_dir, exist_ok=True)
+def accepts_driver(func, parameter='driver'):
+    """세션풀 드라이버(parameter)를 넘겨받을 수 있는 은행 함수인지 확인"""
+    try:
+        return parameter in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
 
-    cmd = (
-        f'"{chrome_path}" --remote-debugging-port={debugging_port} '
-        f'--user-data-dir="{user_data_dir}" '
-        '--no-first-run --no-default-browser-check'
+@contextmanager
+def extra_bank_session(bank_code, download_dir):
+    """구간 병렬 조회용 추가 드라이버. 은행 동시 실행 한도와 세션풀에 여유가 있을 때만 드라이버, 없으면 None"""
+    if session_pool is None or scheduler is None or not scheduler.try_reserve(bank_code):
+        yield None
+        return
+    try:
+        session = session_pool.try_acquire()
+        if session is None:
+            yield None
+            return
+        try:
+            session_pool.set_download_dir(session, download_dir)
+            yield session.driver
+        except Exception:
+            session_pool.release(session, broken=True)
+            raise
+        session_pool.release(session)
+    finally:
+        scheduler.release_reserved(bank_code)
+
+def run_bank_function(bank_code, kind, args, req_seq, download_dir):
+    """은행 함수 실행 (HTTP 엔진 설정 시 우선 시도, selenium 은 세션풀 드라이버 재사용)"""
+    entry = bank_functions[bank_code]
+    http_kind = kind.replace('personal', 'personal_http')
+    # HTTP 엔진 모듈(requests 등)은 HTTP 엔진으로 설정된 은행에서만 import
+    if (BANK_ENGINES.get(bank_code) == 'http' and entry.supports('http_engine')
+            and kind.startswith('personal') and http_kind in entry):
+        try:
+            http_func = entry[http_kind]
+            with span('bank_function', engine='http', kind=kind):
+                return http_func(*args)
+        except BankLoginError:
+            raise  # 인증 실패는 selenium 으로 다시 로그인하지 않음 (계좌 잠금 방지)
+        except Exception as e:
+            logging.warning(f"[HTTP 엔진 실패 → selenium 대체] REQ_SEQ={req_seq}: {extract_core_error_message(e)}")
+
+    func = entry[kind]
+    if session_pool is not None and entry.supports('session_pool') and accepts_driver(func):
+        # 구간 병렬 조회는 따로 크롬을 띄우지 않고 세션풀 / 스케줄러 한도 안에서 추가 세션을 받음
+        extra = {'extra_driver': partial(extra_bank_session, bank_code, download_dir)} \
+            if accepts_driver(func, 'extra_driver') else {}
+        with span('session_checkout'):
+            session = session_pool.acquire()
+        try:
+            with span('bank_function', engine='selenium', kind=kind):
+                session_pool.set_download_dir(session, download_dir)
+                result = func(*args, driver=session.driver, **extra)
+        except Exception:
+            session_pool.release(session, broken=True)
+            raise
+        with span('session_reset'):
+            session_pool.release(session)
+        return result
+
+    with span('bank_function', engine='selenium', kind=kind):
+        return func(*args)
+
+def init_session_pool(size):
+    global session_pool
+    session_pool = DriverSessionPool(
+        CHROME_DRIVER_PATH,
+        os.path.join(BASE_DOWNLOAD_DIR, 'sessions'),
+        size=size + CHUNK_EXTRA_SESSIONS,
+        max_uses=SESSION_MAX_USES,
+        profile_root=SESSION_PROFILE_ROOT
     )
+    session_pool.warm_up(size)
+    return session_pool
 
-    subprocess.Popen(cmd, creationflags=0x00000008, close_fds=True)
-    time.sleep(3)  # 충분한 대기 시간 확보
+def worker_settings(worker_id):
+    """워커별 다운로드 디렉토리 설정 (크롬 세션은 요청마다 세션풀에서 받아 이 폴더로 다운로드 경로 지정)"""
+    return {
+        'worker_id': worker_id,
+        'download_root': os.path.join(BASE_DOWNLOAD_DIR, f"worker_{worker_id}"),
+    }
 
 def not_implemented_bank(*args, **kwargs):
     raise NotImplementedError("해당 은행의 자동화 처리가 아직 구현되지 않았습니다.")
 
-bank_functions = {
-    'BANK001': {'personal': nh_personal, 'corp': nh_corp},                 # 농협은행
+# 은행별 함수는 bank_registry.BANK_MANIFEST 에 등록 (해당 은행 첫 요청 시 모듈 import)
 
 
 def ensure_directory_exists(path):
@@ -148,18 +263,93 @@ def check_file_exists(filepath):
         logging.error(f"[파일 미존재] {filepath}")
         return False
     
-def execute_request(request):
+def output_formats_for(request, output_formats=None):
+    """xlsx 외 추가로 만들 출력 형식 목록 (인자 > 요청 OUTPUT_FORMAT > 기본값 순)"""
+    if output_formats is None:
+        output_formats = request.get('OUTPUT_FORMAT') or DEFAULT_OUTPUT_FORMATS
+    from transactions import EXPORT_FORMATS
+
+    if isinstance(output_formats, str):
+        output_formats = output_formats.split(',')
+    formats = []
+    for fmt in output_formats:
+        fmt = fmt.strip().lower()
+        if fmt in ('', 'xlsx') or fmt in formats:
+            continue
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"지원하지 않는 출력 형식: {fmt}")
+        formats.append(fmt)
+    return formats
+
+def execute_request(request, worker=None, shared_scrape=None, output_formats=None):
+    if worker is None:
+        worker = worker_settings(0)
+
+    # 이 요청에서 기록되는 모든 단계별 소요시간에 요청 정보 태그 부착
+    tags = {
+        'req_seq': request['REQ_SEQ'],
+        'bank_code': request['BANK_SE'],
+        'account_type': request['ACCOUNT_SE'],
+        'worker_id': worker['worker_id'],
+    }
+    with request_context(**tags), span('request_total'):
+        _execute_request(request, worker, shared_scrape, output_formats)
+
+def coalesce_key_for(request):
+    """행 단위 조회를 지원하는 개인 계좌 요청만 묶음 처리 대상 (그 외 None)"""
+    entry = bank_functions.get(request['BANK_SE'])
+    if entry is None or request['ACCOUNT_SE'] == '01' or 'personal_rows' not in entry:
+        return None
+    return coalesce_key(request)
+
+def renew_before_run(request, lease_queue):
+    """묶음 안에서 앞 요청을 기다리는 동안 임대가 끝났을 수 있으므로 실행 직전 다시 연장 (다른 워커가 가져갔으면 False)"""
+    try:
+        if lease_queue.renew(request):
+            return True
+    except Exception as e:
+        # DB 일시 장애 - 하트비트가 임대를 유지하고 있으므로 그대로 실행
+        logging.warning(f"[임대 연장 실패] REQ_SEQ={request['REQ_SEQ']}: {e}")
+        return True
+    logging.warning(f"[임대 만료] REQ_SEQ={request['REQ_SEQ']} 다른 워커가 가져가 건너뜀")
+    return False
+
+def execute_request_group(group, worker, lease_queue=None, heartbeat=None):
+    """같은 계좌 / 겹치는 기간 요청 묶음을 합집합 기간 1회 조회로 처리 (요청별 엑셀 / 상태는 각각)
+    lease_queue 가 주어지면 두 번째 요청부터 실행 직전에 임대를 연장하고, 끝난 요청은 하트비트에서 제외"""
+    if len(group) == 1:
+        execute_request(group[0], worker)
+        return
+
+    start_date, end_date = union_range(group)
+    print(f"[요청 묶음] REQ_SEQ={[r['REQ_SEQ'] for r in group]} → "
+          f"{start_date:%Y-%m-%d}~{end_date:%Y-%m-%d} 1회 조회")
+    shared_scrape = SharedScrape(start_date, end_date, max_attempts=REQUEST_MAX_ATTEMPTS)
+    for index, request in enumerate(group):
+        if index and lease_queue is not None and not renew_before_run(request, lease_queue):
+            if heartbeat is not None:
+                heartbeat.discard(request)
+            continue
+        try:
+            execute_request(request, worker, shared_scrape=shared_scrape)
+        finally:
+            if heartbeat is not None:
+                heartbeat.discard(request)
+
+def _execute_request(request, worker, shared_scrape=None, output_formats=None):
+    from checkpoint import Checkpoint, run_with_retries
+    from excel_stream import KEEP_LOCAL_FILES, result_name, write_transaction_workbooks
+    from transactions import TransactionColumns, export_transactions
+
     bank_code = request['BANK_SE']
     account_type = request['ACCOUNT_SE']
     req_seq = request['REQ_SEQ']
     ini_hptl_no = request['INI_HPTL_NO']
 
-    update_request_status(req_seq, 'P')
-
-    launch_chrome_with_debugging()
-
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    download_dir = os.path.join(BASE_DOWNLOAD_DIR, f"{ini_hptl_no}_{req_seq}_{timestamp}")
+    checkpoint = Checkpoint(req_seq, os.path.join(CHECKPOINT_ROOT, str(req_seq)) if KEEP_LOCAL_FILES else None)
+    # 디스크 체크포인트로 이어서 실행할 때 같은 폴더 / 원격 파일명을 쓰도록 시각도 저장
+    timestamp = checkpoint.run('timestamp', lambda: datetime.now().strftime('%Y%m%d%H%M%S'))
+    download_dir = os.path.join(worker['download_root'], f"{ini_hptl_no}_{req_seq}_{timestamp}")
     ensure_directory_exists(download_dir)
 
     try:
@@ -188,44 +378,108 @@ def execute_request(request):
                 raise ValueError("ACCOUNT_PW2 복호화 실패")
 
         account_number = re.sub(r'\D', '', request['ACCOUNT'])
+        formats = output_formats_for(request, output_formats)
 
         print(f"[요청처리정보] REQ_SEQ={req_seq}, INI_HPTL_NO={ini_hptl_no}, BANK_CODE={bank_code}, "
               f"ACCOUNT_TYPE={account_type}, START_DATE={start_date_str}, END_DATE={end_date_str}, "
               f"ACCOUNT={account_number}, ACCOUNT_PW={account_pw_plain}, "
               f"RPRSNTV_BRTHDY={rprsntv_brthdy_plain}, ACCOUNT_PW2={account_pw2_plain}")
 
-        if bank_code in ('BANK001', 'BANK011'):
-            func = bank_functions[bank_code]['corp' if account_type == '01' else 'personal']
-            original_excel, upload_excel = func(
-                CHROME_DRIVER_PATH,
-                account_number,
-                account_pw_plain,
-                request['BIZRNO'] if account_type == '01' else rprsntv_brthdy_plain,
-                start_date,
-                end_date,
-                download_dir
-            )
-
-
-
-        # 엑셀 파일 생성 이후 부분에서...
-        ext_original = os.path.splitext(original_excel)[1]
-        ext_upload = os.path.splitext(upload_excel)[1]
-
-        api_filename = f"{req_seq}_API_{timestamp}{ext_original}"
-        upload_filename = f"{req_seq}_{timestamp}{ext_upload}"
-
-
-        # SFTP를 통한 파일 업로드 호출
-        upload_file_sftp(original_excel, api_remote_path)
-        upload_file_sftp(upload_excel, upload_remote_path)
-
-        # DB에 저장할 웹 경로 (리눅스 경로 그대로 사용)
-        api_excel_web_path = api_remote_path
-        upload_excel_web_path = upload_remote_path
-
-        # 파일 업로드 성공 이후 DB 상태 업데이트
-        update_request_status(req_seq, 'S', excel_file=upload_excel_web_path, excel_api_file=api_excel_web_path)
+        def build_workbooks():
+            if bank_code in ('BANK001', 'BANK011'):
+                credentials = (
+                    CHROME_DRIVER_PATH,
+                    account_number,
+                    account_pw_plain,
+                    request['BIZRNO'] if account_type == '01' else rprsntv_brthdy_plain,
+                )
+                rows_supported = account_type != '01' and 'personal_rows' in bank_functions[bank_code]
+                # 캐시는 같은 병원 + 같은 인증정보로 조회한 행만 재사용 (다른 비밀번호 / 병원이면 은행에서 새로 조회)
+                cache_scope = '\x1f'.join(str(v or '') for v in (ini_hptl_no, *credentials[2:], account_pw2_plain))
+                use_cache = transaction_cache is not None and bank_functions[bank_code].supports('transaction_cache')
+                if rows_supported and (use_cache or shared_scrape is not None):
+                    def fetch_rows(span_start, span_end):
+                        return run_bank_function(
+                            bank_code, 'personal_rows', credentials + (span_start, span_end, download_dir), req_seq, download_dir
+                        )
+
+                    def fetch_range(range_start, range_end):
+                        if not use_cache:
+                            return fetch_rows(range_start, range_end)
+                        with span('cache_fetch'):
+                            return transaction_cache.fetch(
+                                bank_code, account_number, range_start, range_end, fetch_rows,
+                                is_descending=bank_functions[bank_code].get('is_descending'),
+                                scope=cache_scope
+                            )
+
+                    def fetch_request_rows():
+                        if shared_scrape is not None:
+                            # 묶음의 첫 요청에서 합집합 기간을 조회하고, 나머지는 자기 기간만 잘라 사용
+                            with span('coalesced_fetch'):
+                                return shared_scrape.rows_for(start_date, end_date, fetch_range)
+                        return fetch_range(start_date, end_date)
+
+                    headers, rows = checkpoint.run('rows', fetch_request_rows)
+                    with span('write_workbooks'):
+                        return write_transaction_workbooks(
+                            headers, rows, download_dir, bank_functions[bank_code]['upload_transform']
+                        )
+                return run_bank_function(
+                    bank_code, 'corp' if account_type == '01' else 'personal',
+                    credentials + (start_date, end_date, download_dir), req_seq, download_dir
+                )
+
+
+
+        def build_exports(original_excel):
+            # 행 단위 조회 결과가 있으면 그대로 사용, 없으면(법인 / 오즈 다운로드) 원본 엑셀을 읽어 변환
+            with span('export_columns'):
+                fetched = checkpoint.get('rows')
+                if fetched is not None:
+                    columns = TransactionColumns.from_rows(*fetched)
+                else:
+                    columns = TransactionColumns.from_workbook(original_excel)
+                return export_transactions(columns, formats, f"{req_seq}_{timestamp}", download_dir, KEEP_LOCAL_FILES)
+
+        def run_stages():
+            original_excel, upload_excel = checkpoint.run('workbooks', build_workbooks)
+            exports = checkpoint.run('exports', lambda: build_exports(original_excel)) if formats else []
+
+            # 엑셀 파일 생성 이후 부분에서...
+            # 결과는 파일 경로(법인 등) 또는 메모리 버퍼 - 업로더가 둘 다 처리
+            ext_original = os.path.splitext(result_name(original_excel))[1]
+            ext_upload = os.path.splitext(result_name(upload_excel))[1]
+
+            api_filename = f"{req_seq}_API_{timestamp}{ext_original}"
+            upload_filename = f"{req_seq}_{timestamp}{ext_upload}"
+
+
+            # 추가 출력 형식은 업로드용 엑셀과 같은 이름, 다른 확장자로 같은 폴더에 저장
+            upload_items = [(original_excel, api_remote_path), (upload_excel, upload_remote_path)]
+            upload_items += [(source, f"{posixpath.splitext(upload_remote_path)[0]}.{fmt}") for fmt, source in exports]
+
+            # SFTP를 통한 파일 업로드 호출 (동시 업로드, 이전 시도에서 올라간 파일은 제외)
+            with span('sftp_upload'):
+                pending_uploads = [
+                    (source, remote_path)
+                    for source, remote_path in upload_items
+                    if not checkpoint.is_uploaded(remote_path)
+                ]
+                get_sftp_pool().upload_many(pending_uploads, on_complete=checkpoint.mark_uploaded)
+
+            # DB에 저장할 웹 경로 (리눅스 경로 그대로 사용)
+            api_excel_web_path = api_remote_path
+            upload_excel_web_path = upload_remote_path
+
+            # 파일 업로드 성공 이후 DB 상태 업데이트
+            with span('db_update'):
+                update_request_status(req_seq, 'S', excel_file=upload_excel_web_path, excel_api_file=api_excel_web_path)
+
+        # 실패 시 완료된 단계(조회 결과, 엑셀, 완료된 업로드)는 건너뛰고 최대 REQUEST_MAX_ATTEMPTS 회까지 이어서 재시도
+        run_with_retries(run_stages, checkpoint, max_attempts=REQUEST_MAX_ATTEMPTS, retry_delay=REQUEST_RETRY_DELAY,
+                         describe_error=extract_core_error_message)
+        checkpoint.clear()
 
     except Exception as e:
         # 전체 traceback은 로컬 로그로 저장
@@ -234,15 +488,104 @@ def execute_request(request):
         # 핵심 메시지만 DB에 저장
         core_error_msg = extract_core_error_message(e)
         update_request_status(req_seq, 'E', err_msg=core_error_msg)
+
+    finally:
+        # 평문 거래내역이 작업 PC 에 남지 않도록 요청 폴더 삭제 (디버그/보관 설정 시 유지)
+        if not KEEP_LOCAL_FILES:
+            shutil.rmtree(download_dir, ignore_errors=True)
         
-def main():
+def dispatcher_loop(lease_queue):
+    """DB 에서 요청을 점유해 스케줄러에 넣음 (워커는 스케줄러가 정한 순서대로 꺼내 실행)"""
+    backoff = AdaptiveBackoff(min_delay=IDLE_MIN_DELAY, max_delay=IDLE_MAX_DELAY)
     while True:
-        request = fetch_pending_requests()
-        if request:
-            execute_request(request)
+        if scheduler.pending() >= SCHEDULER_BACKLOG:
+            time.sleep(IDLE_MIN_DELAY)
+            continue
+
+        group = lease_queue.next_group(coalesce_key_for, group_overlapping)
+        if group:
+            backoff.reset()
+            scheduler.submit(group)
         else:
-            print(f"{datetime.now()} 처리할 요청이 없습니다.")
-        time.sleep(1)
+            delay = backoff.next_delay()
+            print(f"{datetime.now()} [dispatcher] 처리할 요청이 없습니다. ({delay:.1f}초 후 재조회) {scheduler.stats()}")
+            time.sleep(delay)
+
+def worker_loop(worker_id, lease_queue):
+    worker = worker_settings(worker_id)
+    while True:
+        job = scheduler.acquire()
+        if job is None:
+            return
+        try:
+            # 스케줄러에서 기다리는 동안 임대가 만료됐을 수 있으므로 실행 직전 연장
+            group = [request for request in job.requests if lease_queue.renew(request)]
+            if group:
+                # 실행 중에도 임대를 주기적으로 연장 (LEASE_SECONDS 보다 오래 걸려도 다시 점유되지 않도록)
+                with LeaseHeartbeat(lease_queue, group) as heartbeat:
+                    execute_request_group(group, worker, lease_queue=lease_queue, heartbeat=heartbeat)
+        except Exception:
+            # 임대 연장 DB 에러, 체크포인트 생성 실패, 에러 상태 기록 실패 등으로 워커 스레드가 죽지 않도록
+            # 로그만 남기고 다음 작업 계속 (상태를 못 바꾼 요청은 임대 만료 후 다시 점유됨)
+            logging.exception(f"[worker {worker_id}] 작업 처리 중 에러: REQ_SEQ={[r['REQ_SEQ'] for r in job.requests]}")
+        finally:
+            scheduler.done(job)
+
+def init_transaction_cache():
+    global transaction_cache
+    key_hex = os.environ.get(TRANSACTION_CACHE_KEY_ENV, '')
+    try:
+        key = bytes.fromhex(key_hex)
+    except ValueError:
+        key = b''
+    if len(key) != 32:
+        logging.warning(f"[거래내역 캐시] {TRANSACTION_CACHE_KEY_ENV} (64자리 hex) 가 없어 캐시를 사용하지 않습니다.")
+        transaction_cache = None
+        return None
+    from transaction_cache import TransactionCache
+
+    ensure_directory_exists(BASE_DOWNLOAD_DIR)
+    transaction_cache = TransactionCache(TRANSACTION_CACHE_PATH, key)
+    transaction_cache.evict(TRANSACTION_CACHE_RETENTION_DAYS)
+    return transaction_cache
+
+def main(num_workers=NUM_WORKERS):
+    global scheduler
+    num_workers = max(num_workers, 1)
+    init_session_pool(num_workers)
+    init_transaction_cache()
+
+    scheduler = FairScheduler()
+    if get_connection is not None:
+        lease_queue = RequestLeaseQueue(
+            get_connection,
+            worker_id=f"{socket.gethostname()}-{os.getpid()}",
+            batch_size=CLAIM_BATCH_SIZE,
+            lease_seconds=LEASE_SECONDS,
+            paramstyle='format'
+        )
+    else:
+        from db_connector import fetch_pending_requests
+
+        logging.warning("[요청 점유] db_connector.get_connection 이 없어 임대 없이 fetch_pending_requests 로 1건씩 처리합니다.")
+        lease_queue = PollingRequestQueue(fetch_pending_requests, update_request_status)
+
+    threads = []
+    for worker_id in range(num_workers):
+        thread = threading.Thread(target=worker_loop, args=(worker_id, lease_queue), name=f"bank-worker-{worker_id}",
+                                  daemon=True)
+        thread.start()
+        threads.append(thread)
+
+    try:
+        dispatcher_loop(lease_queue)
+    finally:
+        # 종료 시 아직 실행하지 않은 점유 요청은 대기 상태로 반납
+        scheduler.close()
+        for job in scheduler.drain():
+            for request in job.requests:
+                lease_queue.release(request)
+        lease_queue.release_all()
 
 if __name__ == "__main__":
     main()
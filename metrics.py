@@ -0,0 +1,151 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+# 요청 처리 단계별 소요시간 기록 (JSONL) 및 분위수 요약 CLI
+# 사용 예) python metrics.py report C:\BankLedgers\metrics\stage_metrics.jsonl --by bank_code
+
+METRICS_PATH = os.environ.get('BANK_METRICS_PATH', r"C:\BankLedgers\metrics\stage_metrics.jsonl")
+
+_write_lock = threading.Lock()
+_context = threading.local()
+
+
+def current_tags():
+    return getattr(_context, 'tags', {})
+
+
+@contextmanager
+def request_context(**tags):
+    """현재 스레드에서 기록하는 모든 span 에 REQ_SEQ, 은행코드 등의 태그를 붙임"""
+    previous = current_tags()
+    _context.tags = {**previous, **tags}
+    try:
+        yield
+    finally:
+        _context.tags = previous
+
+
+def record(stage, duration, status='ok', path=None, **tags):
+    event = {
+        'ts': datetime.now().isoformat(timespec='milliseconds'),
+        'stage': stage,
+        'duration_ms': round(duration * 1000, 1),
+        'status': status,
+        **current_tags(),
+        **tags,
+    }
+    path = path or METRICS_PATH
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with _write_lock, open(path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+    except OSError as e:
+        logging.warning(f"[metrics] 기록 실패: {e}")
+
+
+@contextmanager
+def span(stage, **tags):
+    """with span('sftp_upload'): ... 형태로 단계 소요시간 기록 (예외 발생 시 status=error)"""
+    start = time.perf_counter()
+    status = 'ok'
+    try:
+        yield
+    except Exception:
+        status = 'error'
+        raise
+    finally:
+        record(stage, time.perf_counter() - start, status=status, **tags)
+
+
+def load_events(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+def summarize(events, group_by=None):
+    """(stage, 그룹값) 별 건수, 에러 수, p50 / p95 / p99 (ms)"""
+    groups = defaultdict(list)
+    errors = defaultdict(int)
+    for event in events:
+        key = (event['stage'], event.get(group_by, '-') if group_by else '-')
+        groups[key].append(event['duration_ms'])
+        if event.get('status') != 'ok':
+            errors[key] += 1
+
+    summary = []
+    for key in sorted(groups):
+        values = sorted(groups[key])
+        summary.append({
+            'stage': key[0],
+            'group': key[1],
+            'count': len(values),
+            'errors': errors[key],
+            'p50': percentile(values, 50),
+            'p95': percentile(values, 95),
+            'p99': percentile(values, 99),
+        })
+    return summary
+
+
+def to_prometheus(summary, group_by=None):
+    label = group_by or 'group'
+    lines = ['# TYPE bank_stage_duration_ms summary']
+    for row in summary:
+        for quantile in ('p50', 'p95', 'p99'):
+            lines.append(
+                f'bank_stage_duration_ms{{stage="{row["stage"]}",{label}="{row["group"]}",'
+                f'quantile="0.{quantile[1:]}"}} {row[quantile]:.1f}'
+            )
+        lines.append(f'bank_stage_duration_ms_count{{stage="{row["stage"]}",{label}="{row["group"]}"}} {row["count"]}')
+    return '\n'.join(lines)
+
+
+def print_report(summary, group_by=None):
+    header = f"{'stage':<24}{(group_by or ''):<12}{'count':>8}{'errors':>8}{'p50(ms)':>12}{'p95(ms)':>12}{'p99(ms)':>12}"
+    print(header)
+    print('-' * len(header))
+    for row in summary:
+        print(f"{row['stage']:<24}{str(row['group']):<12}{row['count']:>8}{row['errors']:>8}"
+              f"{row['p50']:>12.1f}{row['p95']:>12.1f}{row['p99']:>12.1f}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="단계별 소요시간 요약")
+    sub = arg_parser.add_subparsers(dest='command', required=True)
+    report = sub.add_parser('report')
+    report.add_argument('path', nargs='?', default=METRICS_PATH)
+    report.add_argument('--by', choices=['bank_code', 'account_type', 'worker_id'], default=None,
+                        help="그룹 기준 태그")
+    report.add_argument('--stage', default=None, help="특정 단계만 출력")
+    report.add_argument('--prometheus', action='store_true', help="Prometheus 텍스트 형식으로 출력")
+    args = arg_parser.parse_args()
+
+    events = load_events(args.path)
+    if args.stage:
+        events = (e for e in events if e['stage'] == args.stage)
+    summary = summarize(events, args.by)
+
+    if args.prometheus:
+        print(to_prometheus(summary, args.by))
+    else:
+        print_report(summary, args.by)
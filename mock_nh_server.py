@@ -0,0 +1,282 @@
+import argparse
+import html
+import io
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# 농협 빠른조회(IPMSP0011I) 로컬 대역 서버
+# 1) 재생 모드: 녹화해 둔 응답을 그대로 재생
+#    recording_dir 구성:
+#      form.html      : GET 조회 화면
+#      page_1.html .. : 조회/더보기 POST 응답 (세션별로 순서대로 재생)
+# 2) 모의 사이트 모드: 입력창 / 날짜 select / 조회 / 더보기 / 엑셀저장(#o_print) 을 갖춘 가짜 조회 화면
+#    행 수, 페이지 크기, 페이지당 응답 지연을 설정해 벤치마크에 사용
+
+SESSION_COOKIE = 'JSESSIONID'
+VIEW_PATH = '/servlet/IPMSP0011I.view'
+
+RESULT_HEADERS = ['순번', '거래일시', '출금금액(원)', '입금금액(원)', '거래후잔액(원)', '거래내용', '거래기록사항', '거래점']
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    def _session_id(self):
+        for part in (self.headers.get('Cookie') or '').split(';'):
+            name, _, value = part.strip().partition('=')
+            if name == SESSION_COOKIE:
+                return value
+        return None
+
+    def _send_file(self, filename, cookie=None):
+        path = os.path.join(self.server.recording_dir, filename)
+        if not os.path.isfile(path):
+            self.send_error(404, f"녹화 응답 없음: {filename}")
+            return
+        with open(path, 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if cookie:
+            self.send_header('Set-Cookie', f"{SESSION_COOKIE}={cookie}; Path=/")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        session_id = uuid.uuid4().hex
+        with self.server.lock:
+            self.server.pages[session_id] = 0
+        self._send_file('form.html', cookie=session_id)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        session_id = self._session_id()
+        with self.server.lock:
+            page = self.server.pages.get(session_id, 0) + 1
+            self.server.pages[session_id] = page
+            self.server.posts.append(body.decode('utf-8', 'replace'))
+        self._send_file(f'page_{page}.html')
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def start_replay_server(recording_dir, host='127.0.0.1', port=0, verbose=False):
+    """백그라운드 스레드로 재생 서버 실행 후 (server, base_url) 반환"""
+    server = ThreadingHTTPServer((host, port), ReplayHandler)
+    server.recording_dir = recording_dir
+    server.verbose = verbose
+    server.lock = threading.Lock()
+    server.pages = {}
+    server.posts = []
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    base_url = f"http://{host}:{server.server_address[1]}{VIEW_PATH}"
+    return server, base_url
+
+
+def generate_rows(total_rows, end_date):
+    """최신 거래부터 내려가는 결정적(deterministic) 가짜 거래내역"""
+    rows = []
+    balance = 50_000_000
+    for idx in range(total_rows):
+        tx_time = end_date - timedelta(minutes=37 * idx)
+        deposit = (idx * 7919) % 300_000 if idx % 3 else 0
+        withdrawal = 0 if deposit else (idx * 104729) % 200_000
+        rows.append([
+            str(idx + 1),
+            tx_time.strftime('%Y/%m/%d %H:%M:%S'),
+            f"{withdrawal:,}",
+            f"{deposit:,}",
+            f"{balance:,}",
+            '인터넷' if idx % 2 else '타행이체',
+            f"거래처{idx % 97:02d}",
+            '본점',
+        ])
+        balance += withdrawal - deposit
+    return rows
+
+
+def _options(values, selected=None):
+    return ''.join(f'<option value="{v}"{" selected" if v == selected else ""}>{v}</option>' for v in values)
+
+
+def render_form_page(hidden=None, result_html=''):
+    years = [str(y) for y in range(2000, 2031)]
+    months = [f"{m:02d}" for m in range(1, 13)]
+    days = [f"{d:02d}" for d in range(1, 32)]
+    hidden_inputs = ''.join(
+        f'<input type="hidden" name="{html.escape(k)}" value="{html.escape(str(v))}">' for k, v in (hidden or {}).items()
+    )
+    date_selects = ''.join(
+        f'<select name="{prefix}_year">{_options(years)}</select>'
+        f'<select name="{prefix}_month">{_options(months)}</select>'
+        f'<select name="{prefix}_date">{_options(days)}</select>'
+        for prefix in ('start', 'end')
+    )
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>빠른조회 (모의)</title></head>
+<body>
+<form id="frm" name="frm" method="post" action="{VIEW_PATH}">
+  {hidden_inputs}
+  <input type="text" id="InqGjaNbr" name="InqGjaNbr">
+  <input type="password" id="GjaSctNbr" name="GjaSctNbr">
+  <input type="text" id="rlno1" name="rlno1">
+  {date_selects}
+  <button type="button" id="btn_search">조회</button>
+</form>
+<div id="hiddenResult">{result_html}</div>
+<div id="o_print"><span><a href="#" onclick="window.open('/mock/oz', 'oz'); return false;">인쇄 및 엑셀저장</a></span></div>
+<script>
+function applyResult(doc, append) {{
+  var incoming = doc.querySelector('#hiddenResult');
+  var target = document.querySelector('#hiddenResult');
+  if (!append || !target.querySelector('table.tb_col')) {{
+    target.innerHTML = incoming.innerHTML;
+  }} else {{
+    var tbody = target.querySelector('table.tb_col tbody');
+    incoming.querySelectorAll('table.tb_col tbody tr').forEach(function (tr) {{ tbody.appendChild(tr); }});
+    var more = target.querySelector('#moreBtnArea');
+    if (more) more.remove();
+    var nextMore = incoming.querySelector('#moreBtnArea');
+    if (nextMore) target.appendChild(nextMore);
+  }}
+  doc.querySelectorAll('#frm input[type=hidden]').forEach(function (h) {{
+    var mine = document.querySelector('#frm input[name="' + h.name + '"]');
+    if (mine) {{ mine.value = h.value; }} else {{ document.querySelector('#frm').appendChild(h); }}
+  }});
+  bindMore();
+}}
+function submitPage(append) {{
+  var body = new URLSearchParams(new FormData(document.querySelector('#frm')));
+  fetch('{VIEW_PATH}', {{method: 'POST', body: body, credentials: 'same-origin'}})
+    .then(function (r) {{ return r.text(); }})
+    .then(function (t) {{ applyResult(new DOMParser().parseFromString(t, 'text/html'), append); }});
+}}
+function bindMore() {{
+  var a = document.querySelector('#moreBtnArea span.btn3 a');
+  if (a) a.onclick = function () {{ submitPage(true); return false; }};
+}}
+document.querySelector('#btn_search').onclick = function () {{
+  var page = document.querySelector('#frm input[name=pageNo]');
+  if (page) page.value = '1';
+  submitPage(false);
+}};
+</script>
+</body></html>"""
+
+
+def render_result_table(rows, has_more):
+    head = ''.join(f'<th>{h}</th>' for h in RESULT_HEADERS)
+    body = ''.join('<tr>' + ''.join(f'<td>{html.escape(c)}</td>' for c in row) + '</tr>' for row in rows)
+    if not rows:
+        body = f'<tr><td colspan="{len(RESULT_HEADERS)}">조회내역이 없습니다.</td></tr>'
+    more = '<div id="moreBtnArea"><span class="btn3"><a href="#">더보기</a></span></div>' if has_more else ''
+    return f'<table class="tb_col"><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>{more}'
+
+
+def build_export_workbook(rows):
+    """오즈리포트 엑셀저장 대역 (제목 행 + 헤더 + 거래내역)"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(['거래내역조회 (모의)'])
+    sheet.append(RESULT_HEADERS)
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+class MockSiteHandler(BaseHTTPRequestHandler):
+    def _send(self, body, content_type='text/html; charset=utf-8', headers=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == VIEW_PATH:
+            self._send(render_form_page(hidden={'pageNo': '1'}))
+        elif path == '/mock/oz':
+            self._send('<html><body><a id="xls" href="/mock/export.xls">엑셀저장</a></body></html>')
+        elif path == '/mock/export.xls':
+            # 실제 오즈리포트 파일 형식과 무관하게 xlsx 내용을 내려줌 (excel_stream 은 시그니처로 판별)
+            self._send(build_export_workbook(self.server.rows), 'application/vnd.ms-excel',
+                       {'Content-Disposition': 'attachment; filename="NH_export.xls"'})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode('utf-8')).items()}
+        page = int(form.get('pageNo') or 1)
+        size = self.server.page_size
+        rows = self.server.rows[(page - 1) * size:page * size]
+        has_more = page * size < len(self.server.rows)
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.post_count += 1
+
+        self._send(render_form_page(
+            hidden={'pageNo': str(page + 1)},
+            result_html=render_result_table(rows, has_more)
+        ))
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def start_mock_site(total_rows=300, page_size=30, latency=0.0, host='127.0.0.1', port=0, verbose=False):
+    """모의 조회 사이트 실행 후 (server, 조회화면 url) 반환"""
+    server = ThreadingHTTPServer((host, port), MockSiteHandler)
+    server.rows = generate_rows(total_rows, datetime(2025, 12, 31, 18, 0, 0))
+    server.page_size = page_size
+    server.latency = latency
+    server.verbose = verbose
+    server.lock = threading.Lock()
+    server.post_count = 0
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    return server, f"http://{host}:{server.server_address[1]}{VIEW_PATH}"
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="농협 빠른조회 로컬 대역 서버")
+    arg_parser.add_argument('--replay', metavar='RECORDING_DIR', help="녹화 응답 재생 모드")
+    arg_parser.add_argument('--rows', type=int, default=300, help="모의 사이트 전체 거래 건수")
+    arg_parser.add_argument('--page-size', type=int, default=30, help="더보기 1회당 건수")
+    arg_parser.add_argument('--latency', type=float, default=0.0, help="조회 응답 지연(초)")
+    arg_parser.add_argument('--port', type=int, default=8765)
+    args = arg_parser.parse_args()
+
+    if args.replay:
+        server, url = start_replay_server(args.replay, port=args.port, verbose=True)
+    else:
+        server, url = start_mock_site(args.rows, args.page_size, args.latency, port=args.port, verbose=True)
+    print(f"대역 서버 실행 중: {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,59 @@
+import pandas as pd
+from bs4 import BeautifulSoup as bs
+from bs4 import FeatureNotFound
+
+RESULT_TABLE_SELECTOR = '#hiddenResult table.tb_col'
+
+# 거래내역 항목 ← 조회결과 헤더에 포함된 키워드 (헤더 행 / 컬럼 판별용)
+# 업로드용 엑셀 양식은 은행 모듈의 기존 변환 함수(read_and_transform_downloaded_excel)가 결정
+COLUMN_KEYWORDS = [
+    ('거래일시', ('거래일시', '거래일자', '거래일')),
+    ('출금금액', ('출금',)),
+    ('입금금액', ('입금',)),
+    ('거래후잔액', ('잔액',)),
+    ('거래내용', ('거래내용', '적요')),
+    ('거래기록사항', ('기록사항', '받는분', '보낸분')),
+    ('거래점', ('거래점', '취급점')),
+]
+
+
+def make_soup(html):
+    """lxml 파서가 있으면 사용하고 없으면 기본 html.parser 사용"""
+    try:
+        return bs(html, 'lxml')
+    except FeatureNotFound:
+        return bs(html, 'html.parser')
+
+
+def parse_result_table(html):
+    """조회결과 테이블의 헤더와 행(셀 텍스트 목록) 추출"""
+    soup = html if isinstance(html, bs) else make_soup(html)
+    table = soup.select_one(RESULT_TABLE_SELECTOR)
+    if table is None:
+        return [], []
+
+    headers = [th.get_text(' ', strip=True) for th in table.select('thead th')]
+    rows = []
+    for tr in table.select('tbody tr'):
+        cells = [td.get_text(' ', strip=True) for td in tr.find_all('td')]
+        if len(cells) <= 1:
+            continue  # '조회내역이 없습니다' 안내 행
+        rows.append(cells)
+    return headers, rows
+
+
+def rows_to_dataframe(headers, rows):
+    """헤더 수와 셀 수가 다르면(2단 헤더 / rowspan 등 화면 구조 변경) 컬럼을 특정할 수 없으므로 파싱 실패 처리"""
+    mismatched = [idx for idx, row in enumerate(rows) if len(row) != len(headers)]
+    if mismatched:
+        raise ValueError(f"조회결과 헤더({len(headers)}개)와 셀 수({len(rows[mismatched[0]])}개)가 다릅니다. "
+                         f"(불일치 {len(mismatched)}행, 헤더: {headers})")
+    return pd.DataFrame(rows, columns=headers)
+
+
+def find_column(columns, keywords):
+    for keyword in keywords:
+        for column in columns:
+            if keyword in str(column):
+                return column
+    return None
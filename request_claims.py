@@ -0,0 +1,423 @@
+import argparse
+import logging
+import os
+import random
+import sqlite3
+import threading
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+
+# 대기 요청을 워커 ID 로 일정 시간 임대(lease)해 일괄 점유하는 API
+# 만료된 임대는 다른 워커가 자동으로 다시 가져감 (워커 비정상 종료 시 'P' 고착 방지)
+# 실행 중에는 LeaseHeartbeat 가 주기적으로 임대를 연장 (긴 요청이 만료돼 중복 실행되지 않도록)
+# 요청 테이블 / 상태값 / 연결 함수는 db_connector 에 있으면 그 값을 사용 (LEASE_OWNER / LEASE_EXPIRES 컬럼은 migrate_lease_columns 로 추가)
+# db_connector 에 없으면 기본값 사용 - 환경변수 BANK_REQUEST_TABLE / BANK_STATUS_PENDING / BANK_STATUS_PROCESSING 로 변경
+# get_connection 이 없으면 임대 대신 기존 fetch_pending_requests 방식(PollingRequestQueue)으로 동작
+
+try:
+    import db_connector
+except ModuleNotFoundError as e:
+    if e.name != 'db_connector':
+        raise
+    db_connector = None  # db_connector 가 없는 로컬 테스트(create_sqlite_standin) 전용
+
+REQUEST_TABLE = getattr(db_connector, 'REQUEST_TABLE', None) or os.environ.get('BANK_REQUEST_TABLE', 'BANK_INQ_REQ')
+STATUS_PENDING = getattr(db_connector, 'STATUS_PENDING', None) or os.environ.get('BANK_STATUS_PENDING', 'W')
+STATUS_PROCESSING = getattr(db_connector, 'STATUS_PROCESSING', None) or os.environ.get('BANK_STATUS_PROCESSING', 'P')
+get_connection = getattr(db_connector, 'get_connection', None)
+
+LEASE_SECONDS = 600
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _sql(query, paramstyle):
+    """'?' 플레이스홀더를 드라이버 paramstyle 에 맞게 변환 (sqlite3: qmark, pymysql: format)"""
+    return query.replace('?', '%s') if paramstyle == 'format' else query
+
+
+def _db_time(paramstyle, offset_seconds=0, now=None):
+    """임대 시각 SQL 식과 파라미터 - 워커마다 시계가 다를 수 있으므로 DB 서버 시각 기준
+    now 를 주면(동작 확인용) 그 시각을 문자열 파라미터로 사용"""
+    if now is not None:
+        return '?', ((now + timedelta(seconds=offset_seconds)).strftime(DATETIME_FORMAT),)
+    if paramstyle == 'format':
+        if offset_seconds:
+            return 'NOW() + INTERVAL ? SECOND', (offset_seconds,)
+        return 'NOW()', ()
+    if offset_seconds:
+        return "datetime('now', 'localtime', ?)", (f"+{offset_seconds} seconds",)
+    return "datetime('now', 'localtime')", ()
+
+
+def _fetch_dicts(cursor):
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def claim_requests(conn, worker_id, batch_size=5, lease_seconds=LEASE_SECONDS, paramstyle='qmark', now=None):
+    """대기 또는 임대 만료 요청을 최대 batch_size 건 원자적으로 점유하고 목록 반환"""
+    now_sql, now_params = _db_time(paramstyle, now=now)
+    expires_sql, expires_params = _db_time(paramstyle, lease_seconds, now=now)
+    token = f"{worker_id}:{uuid.uuid4().hex}"
+
+    claimable = f"(STATUS = ? OR (STATUS = ? AND LEASE_EXPIRES < {now_sql}))"
+    claimable_params = (STATUS_PENDING, STATUS_PROCESSING) + now_params
+    query = (
+        f"UPDATE {REQUEST_TABLE} SET STATUS = ?, LEASE_OWNER = ?, LEASE_EXPIRES = {expires_sql} "
+        f"WHERE REQ_SEQ IN (SELECT REQ_SEQ FROM ("
+        f"SELECT REQ_SEQ FROM {REQUEST_TABLE} WHERE {claimable} ORDER BY REQ_SEQ LIMIT ?"
+        f") AS candidates) AND {claimable}"
+    )
+    params = (
+        (STATUS_PROCESSING, token) + expires_params
+        + claimable_params + (batch_size,)
+        + claimable_params
+    )
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(_sql(query, paramstyle), params)
+        conn.commit()
+        if cursor.rowcount == 0:
+            return []
+
+        cursor.execute(
+            _sql(f"SELECT * FROM {REQUEST_TABLE} WHERE LEASE_OWNER = ? ORDER BY REQ_SEQ", paramstyle),
+            (token,)
+        )
+        return _fetch_dicts(cursor)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def claim_matching_requests(conn, worker_id, request, lease_seconds=LEASE_SECONDS, paramstyle='qmark', now=None):
+    """request 와 같은 은행 / 계좌 / 계좌구분의 대기 요청을 추가로 점유 (요청 묶음 처리용)"""
+    expires_sql, expires_params = _db_time(paramstyle, lease_seconds, now=now)
+    token = f"{worker_id}:{uuid.uuid4().hex}"
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            _sql(f"UPDATE {REQUEST_TABLE} SET STATUS = ?, LEASE_OWNER = ?, LEASE_EXPIRES = {expires_sql} "
+                 f"WHERE STATUS = ? AND BANK_SE = ? AND ACCOUNT = ? AND ACCOUNT_SE = ?", paramstyle),
+            (STATUS_PROCESSING, token) + expires_params
+            + (STATUS_PENDING, request['BANK_SE'], request['ACCOUNT'], request['ACCOUNT_SE'])
+        )
+        conn.commit()
+        if cursor.rowcount == 0:
+            return []
+
+        cursor.execute(
+            _sql(f"SELECT * FROM {REQUEST_TABLE} WHERE LEASE_OWNER = ? ORDER BY REQ_SEQ", paramstyle),
+            (token,)
+        )
+        return _fetch_dicts(cursor)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def renew_lease(conn, req_seq, lease_owner, lease_seconds=LEASE_SECONDS, paramstyle='qmark', now=None):
+    """처리 중인 요청의 임대 연장. 이미 다른 워커가 가져갔으면 False"""
+    expires_sql, expires_params = _db_time(paramstyle, lease_seconds, now=now)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            _sql(f"UPDATE {REQUEST_TABLE} SET LEASE_EXPIRES = {expires_sql} "
+                 f"WHERE REQ_SEQ = ? AND LEASE_OWNER = ? AND STATUS = ?", paramstyle),
+            expires_params + (req_seq, lease_owner, STATUS_PROCESSING)
+        )
+        conn.commit()
+        return cursor.rowcount == 1
+    finally:
+        cursor.close()
+
+
+def release_request(conn, req_seq, lease_owner, paramstyle='qmark'):
+    """처리하지 못한 요청을 대기 상태로 반납"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            _sql(f"UPDATE {REQUEST_TABLE} SET STATUS = ?, LEASE_OWNER = NULL, LEASE_EXPIRES = NULL "
+                 f"WHERE REQ_SEQ = ? AND LEASE_OWNER = ? AND STATUS = ?", paramstyle),
+            (STATUS_PENDING, req_seq, lease_owner, STATUS_PROCESSING)
+        )
+        conn.commit()
+        return cursor.rowcount == 1
+    finally:
+        cursor.close()
+
+
+def lease_migration_sql(table=REQUEST_TABLE):
+    """요청 테이블에 임대 컬럼 / 인덱스를 추가하는 DDL (MySQL, SQLite 공통)"""
+    return [
+        f"ALTER TABLE {table} ADD COLUMN LEASE_OWNER VARCHAR(100) NULL",
+        f"ALTER TABLE {table} ADD COLUMN LEASE_EXPIRES DATETIME NULL",
+        f"CREATE INDEX IX_{table}_LEASE ON {table} (STATUS, LEASE_EXPIRES)",
+    ]
+
+
+def lease_backfill_sql(table=REQUEST_TABLE, lease_seconds=LEASE_SECONDS, paramstyle='qmark'):
+    """임대 컬럼 추가 전(기존 워커)부터 처리중인 요청에 만료 시각 부여
+    LEASE_EXPIRES 가 NULL 이면 만료 비교에 걸리지 않아 워커가 죽어도 영영 재점유되지 않음
+    기존 워커가 처리 중일 수 있으므로 바로 만료시키지 않고 lease_seconds 유예 후 재점유 대상이 됨"""
+    expires_sql, expires_params = _db_time(paramstyle, lease_seconds)
+    query = _sql(f"UPDATE {table} SET LEASE_EXPIRES = {expires_sql} "
+                 f"WHERE STATUS = ? AND LEASE_EXPIRES IS NULL", paramstyle)
+    return query, expires_params + (STATUS_PROCESSING,)
+
+
+def migrate_lease_columns(conn, table=REQUEST_TABLE, paramstyle='qmark', lease_seconds=LEASE_SECONDS):
+    """임대 컬럼이 없으면 추가하고, 만료 시각이 없는 처리중 요청에 만료 시각 부여. 실행한 SQL 목록 반환"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT * FROM {table} WHERE 1 = 0")
+        columns = {col[0].upper() for col in cursor.description}
+        cursor.fetchall()
+
+        statements = []
+        if not {'LEASE_OWNER', 'LEASE_EXPIRES'} <= columns:
+            statements = [sql for sql in lease_migration_sql(table)
+                          if not any(f"ADD COLUMN {name} " in sql for name in columns)]
+            for sql in statements:
+                cursor.execute(sql)
+
+        backfill_sql, backfill_params = lease_backfill_sql(table, lease_seconds, paramstyle)
+        cursor.execute(backfill_sql, backfill_params)
+        if cursor.rowcount > 0:
+            statements.append(f"{backfill_sql} -- {cursor.rowcount}건")
+        conn.commit()
+        return statements
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+class LeaseHeartbeat:
+    """실행 중인 요청들의 임대를 interval 마다 연장하는 백그라운드 스레드 (with 블록 동안 유지)"""
+
+    def __init__(self, lease_queue, requests, interval=None):
+        self.lease_queue = lease_queue
+        self.interval = interval or max(lease_queue.lease_seconds / 3, 1)
+        self._requests = {request['REQ_SEQ']: request for request in requests}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _beat(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                requests = list(self._requests.values())
+            for request in requests:
+                try:
+                    if self.lease_queue.renew(request):
+                        continue
+                    logging.warning(f"[임대 연장 불가] REQ_SEQ={request['REQ_SEQ']} 완료됐거나 다른 워커가 가져감")
+                    self.discard(request)
+                except Exception as e:
+                    # DB 일시 장애 - 다음 주기에 다시 시도 (임대 시간 안에 복구되면 문제 없음)
+                    logging.warning(f"[임대 연장 실패] REQ_SEQ={request['REQ_SEQ']}: {e}")
+
+    def discard(self, request):
+        """처리가 끝난 요청은 더 이상 연장하지 않음"""
+        with self._lock:
+            self._requests.pop(request['REQ_SEQ'], None)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._beat, name='lease-heartbeat', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class PollingRequestQueue:
+    """db_connector 에 get_connection 이 없을 때 쓰는 대체 큐 (RequestLeaseQueue 와 같은 메서드)
+    기존 fetch_pending_requests 로 1건씩 가져와 처리중 상태로 바꿈 - 임대가 없으므로 묶음 처리 / 만료 재점유 없음"""
+
+    lease_seconds = LEASE_SECONDS
+
+    def __init__(self, fetch_pending, update_status):
+        self.fetch_pending = fetch_pending
+        self.update_status = update_status
+
+    def next_group(self, key_func=None, group_func=None):
+        request = self.fetch_pending()
+        if not request:
+            return []
+        self.update_status(request['REQ_SEQ'], STATUS_PROCESSING)
+        return [request]
+
+    def renew(self, request):
+        return True
+
+    def release(self, request):
+        self.update_status(request['REQ_SEQ'], STATUS_PENDING)
+        return True
+
+    def release_all(self):
+        pass
+
+
+class AdaptiveBackoff:
+    """요청이 없을수록 폴링 간격을 늘리고, 요청을 받으면 최소 간격으로 복귀"""
+
+    def __init__(self, min_delay=1.0, max_delay=30.0, factor=2.0, jitter=0.1):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.jitter = jitter
+        self.current = min_delay
+
+    def reset(self):
+        self.current = self.min_delay
+
+    def next_delay(self):
+        delay = self.current
+        self.current = min(self.current * self.factor, self.max_delay)
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+
+class RequestLeaseQueue:
+    """일괄 점유한 요청을 하나씩 꺼내 주는 워커별 큐"""
+
+    def __init__(self, connect, worker_id, batch_size=5, lease_seconds=LEASE_SECONDS, paramstyle='qmark'):
+        self.connect = connect
+        self.worker_id = worker_id
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.paramstyle = paramstyle
+        self._buffer = deque()
+
+    def _with_connection(self, func, *args, **kwargs):
+        conn = self.connect()
+        try:
+            return func(conn, *args, paramstyle=self.paramstyle, **kwargs)
+        finally:
+            conn.close()
+
+    def next(self):
+        if not self._buffer:
+            self._buffer.extend(self._with_connection(
+                claim_requests, self.worker_id, self.batch_size, self.lease_seconds
+            ))
+
+        while self._buffer:
+            request = self._buffer.popleft()
+            # 버퍼에서 기다리는 동안 만료됐을 수 있으므로 꺼낼 때 임대 연장
+            if self._with_connection(renew_lease, request['REQ_SEQ'], request['LEASE_OWNER'], self.lease_seconds):
+                return request
+            logging.warning(f"[임대 만료] REQ_SEQ={request['REQ_SEQ']} 다른 워커가 가져감 → 건너뜀")
+        return None
+
+    def next_group(self, key_func, group_func):
+        """다음 요청과 함께 처리할 요청 묶음 반환
+        key_func(request) 가 None 이면 단독 처리, 같은 키 요청은 group_func 로 묶고 나머지는 버퍼에 남김"""
+        request = self.next()
+        if request is None:
+            return []
+        key = key_func(request)
+        if key is None:
+            return [request]
+
+        self._buffer.extend(self._with_connection(
+            claim_matching_requests, self.worker_id, request, self.lease_seconds
+        ))
+        candidates = [r for r in self._buffer if key_func(r) == key]
+        group = next(g for g in group_func([request] + candidates) if request in g)
+
+        members = []
+        for member in group:
+            if member is request:
+                members.append(member)
+                continue
+            self._buffer.remove(member)
+            if self._with_connection(renew_lease, member['REQ_SEQ'], member['LEASE_OWNER'], self.lease_seconds):
+                members.append(member)
+            else:
+                logging.warning(f"[임대 만료] REQ_SEQ={member['REQ_SEQ']} 다른 워커가 가져감 → 묶음에서 제외")
+        return members
+
+    def renew(self, request):
+        """대기 중이던 요청을 실행 직전 임대 연장 (이미 다른 워커가 가져갔으면 False)"""
+        return self._with_connection(renew_lease, request['REQ_SEQ'], request['LEASE_OWNER'], self.lease_seconds)
+
+    def release(self, request):
+        return self._with_connection(release_request, request['REQ_SEQ'], request['LEASE_OWNER'])
+
+    def release_all(self):
+        while self._buffer:
+            request = self._buffer.popleft()
+            self._with_connection(release_request, request['REQ_SEQ'], request['LEASE_OWNER'])
+
+
+def create_sqlite_standin(path=':memory:'):
+    """로컬 테스트용 SQLite 요청 테이블 생성 (임대 컬럼은 운영 DB 와 같은 마이그레이션으로 추가)"""
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {REQUEST_TABLE} ("
+        "REQ_SEQ INTEGER PRIMARY KEY, INI_HPTL_NO TEXT, BANK_SE TEXT, ACCOUNT_SE TEXT, "
+        "ACCOUNT TEXT, ACCOUNT_PW TEXT, ACCOUNT_PW2 TEXT, RPRSNTV_BRTHDY TEXT, BIZRNO TEXT, "
+        "SCH_BGNDE TEXT, SCH_ENDDE TEXT, STATUS TEXT)"
+    )
+    conn.commit()
+    migrate_lease_columns(conn)
+    return conn
+
+
+if __name__ == "__main__":
+    # 사용 예) python request_claims.py --migrate     : 운영 DB 에 임대 컬럼 추가 / 처리중 요청 만료 시각 보정
+    #          python request_claims.py --print-sql   : 실행할 SQL 만 출력
+    #          python request_claims.py               : SQLite 로 점유 / 만료 재점유 동작 확인
+    arg_parser = argparse.ArgumentParser(description="요청 임대(lease) 마이그레이션 / 동작 확인")
+    arg_parser.add_argument('--migrate', action='store_true')
+    arg_parser.add_argument('--print-sql', action='store_true')
+    args = arg_parser.parse_args()
+
+    if args.print_sql:
+        backfill_sql, backfill_params = lease_backfill_sql(paramstyle='format')
+        print(";\n".join(lease_migration_sql() + [backfill_sql % tuple(f"'{p}'" if isinstance(p, str) else p for p in backfill_params)]) + ";")
+        raise SystemExit
+    if args.migrate:
+        if get_connection is None:
+            raise SystemExit("db_connector.get_connection 이 없어 마이그레이션을 실행할 수 없습니다. (--print-sql 로 DDL 확인)")
+        db_conn = get_connection()
+        try:
+            applied = migrate_lease_columns(db_conn, paramstyle='format')
+        finally:
+            db_conn.close()
+        print("\n".join(applied) if applied else f"{REQUEST_TABLE}: 임대 컬럼이 이미 있습니다.")
+        raise SystemExit
+
+    conn = create_sqlite_standin()
+    for seq in range(1, 8):
+        conn.execute(f"INSERT INTO {REQUEST_TABLE} (REQ_SEQ, BANK_SE, STATUS) VALUES (?, 'BANK001', ?)",
+                     (seq, STATUS_PENDING))
+    conn.commit()
+
+    first = claim_requests(conn, 'worker-a', batch_size=5)
+    second = claim_requests(conn, 'worker-b', batch_size=5)
+    print("worker-a:", [r['REQ_SEQ'] for r in first])
+    print("worker-b:", [r['REQ_SEQ'] for r in second])
+
+    # worker-a 가 죽었다고 가정 → 임대 만료 후 재점유
+    later = datetime.now() + timedelta(seconds=LEASE_SECONDS + 1)
+    reclaimed = claim_requests(conn, 'worker-c', batch_size=10, now=later)
+    print("worker-c (만료 재점유):", [r['REQ_SEQ'] for r in reclaimed])
@@ -0,0 +1,167 @@
+import argparse
+import fnmatch
+import logging
+import re
+import statistics
+import time
+
+from metrics import record
+
+# 은행 페이지 리소스 차단 정책 및 가벼운 크롬 프로필
+# - 크롬 실행 옵션(확장, 백그라운드 서비스 등)은 세션이 여러 은행에 재사용되므로 공통 적용
+# - URL 차단은 요청마다 은행 코드별로 CDP Network.setBlockedURLs 로 적용
+# - 보안키패드 / 키보드보안 / 오즈리포트 스크립트 / 이미지 / 폰트는 절대 차단하지 않음 (PROTECTED_KEYWORDS 로 검사)
+#   setBlockedURLs 는 예외 패턴을 지원하지 않으므로 확장자 전체(*.png, *.woff 등)를 막는 패턴은
+#   transkey 키패드 이미지, 오즈리포트 폰트까지 막게 되어 사용하지 않음 (경로 / 도메인 단위로만 차단)
+
+LEAN_CHROME_ARGS = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-client-side-phishing-detection",
+    "--disable-features=Translate,OptimizationHints,MediaRouter,AutofillServerCommunication",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--metrics-recording-only",
+]
+
+LEAN_CHROME_PREFS = {
+    "safebrowsing.enabled": False,  # 다운로드/페이지마다 세이프브라우징 조회 생략
+    "profile.default_content_setting_values.geolocation": 2,
+    "profile.default_content_setting_values.media_stream": 2,
+}
+
+IMAGE_PATTERNS = ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.bmp', '*.ico']
+FONT_PATTERNS = ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot']
+MEDIA_PATTERNS = ['*.mp4', '*.webm', '*.mp3']
+TRACKER_PATTERNS = [
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*facebook.net*',
+    '*facebook.com/tr*', '*wcs.naver.net*', '*analytics.kakao.com*', '*criteo.*', '*hotjar.com*',
+]
+
+# 키보드보안 / 보안키패드 / 오즈리포트 관련 URL 키워드 (소문자 비교)
+PROTECTED_KEYWORDS = ['nppfs', 'npkfx', 'touchen', 'transkey', 'raon', 'kings', 'ipinside', 'veraport', 'oz']
+
+RESOURCE_POLICIES = {
+    'default': {
+        'blocked_urls': MEDIA_PATTERNS + TRACKER_PATTERNS,
+        'block_images': False,
+        'protected_keywords': PROTECTED_KEYWORDS,
+    },
+    'BANK001': {  # 농협은행 - 조회 화면 배너 / 이벤트 / 팝업 경로만 차단 (이미지 전체 차단은 키패드 이미지까지 막음)
+        'blocked_urls': MEDIA_PATTERNS + TRACKER_PATTERNS + ['*/banner/*', '*/event/*', '*/popup/*'],
+        'block_images': False,
+        'protected_keywords': PROTECTED_KEYWORDS,
+    },
+}
+
+
+def get_policy(bank_code):
+    return RESOURCE_POLICIES.get(bank_code, RESOURCE_POLICIES['default'])
+
+
+def is_protected(pattern, keywords):
+    """차단 패턴이 보호 대상 스크립트/리소스를 막을 수 있는지 판단"""
+    matcher = re.compile(fnmatch.translate(pattern.lower()))
+    for keyword in keywords:
+        if keyword in pattern.lower():
+            return True
+        samples = [f"https://bank.example/{keyword}/{keyword}.js", f"https://bank.example/js/{keyword}.js",
+                   f"https://bank.example/{keyword}/viewer.css", f"https://bank.example/{keyword}/servlet"]
+        # 키패드 버튼 이미지 / 오즈리포트 폰트 등 정적 리소스
+        samples += [f"https://bank.example/{keyword}/img/key{ext[1:]}" for ext in IMAGE_PATTERNS + FONT_PATTERNS]
+        if any(matcher.match(sample) for sample in samples):
+            return True
+    return False
+
+
+def blocked_url_patterns(policy):
+    patterns = list(policy['blocked_urls'])
+    if policy.get('block_images'):
+        patterns += IMAGE_PATTERNS
+    keywords = policy.get('protected_keywords', PROTECTED_KEYWORDS)
+    safe = [p for p in patterns if not is_protected(p, keywords)]
+    for pattern in sorted(set(patterns) - set(safe)):
+        logging.warning(f"[리소스 정책] 보안모듈/오즈리포트와 겹치는 차단 패턴 제외: {pattern}")
+    return safe
+
+
+def apply_lean_profile(options, prefs):
+    """get_driver 의 크롬 옵션 / prefs 에 공통 경량화 설정 추가"""
+    for arg in LEAN_CHROME_ARGS:
+        options.add_argument(arg)
+    prefs.update(LEAN_CHROME_PREFS)
+
+
+def apply_resource_policy(driver, bank_code):
+    """현재 탭에 은행별 URL 차단 목록 적용 (driver.get 이전에 호출)"""
+    patterns = blocked_url_patterns(get_policy(bank_code))
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+    return patterns
+
+
+def clear_resource_policy(driver):
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': []})
+
+
+PAGE_LOAD_SCRIPT = """
+var nav = performance.getEntriesByType('navigation')[0];
+var resources = performance.getEntriesByType('resource');
+var bytes = nav ? nav.transferSize : 0;
+resources.forEach(function (r) { bytes += r.transferSize || 0; });
+return {
+  load_ms: nav ? nav.loadEventEnd - nav.startTime : 0,
+  dom_ms: nav ? nav.domContentLoadedEventEnd - nav.startTime : 0,
+  bytes: bytes,
+  resources: resources.length
+};
+"""
+
+
+def measure_page_load(driver, stage='page_load', **tags):
+    """Navigation / Resource Timing 으로 페이지 로드 시간과 전송 바이트 기록
+    (Timing-Allow-Origin 이 없는 외부 리소스의 transferSize 는 0 으로 집계됨)"""
+    try:
+        stats = driver.execute_script(PAGE_LOAD_SCRIPT)
+    except Exception as e:
+        logging.warning(f"[리소스 정책] 페이지 로드 측정 실패: {e}")
+        return None
+    record(stage, max(stats['load_ms'], 0) / 1000, bytes=stats['bytes'], resources=stats['resources'], **tags)
+    return stats
+
+
+if __name__ == "__main__":
+    # 정책 적용 전후 페이지 로드 시간 / 전송량 비교
+    # 사용 예) python resource_policy.py https://banking.nonghyup.com/servlet/IPMSP0011I.view --runs 3
+    from NH_BANK import get_driver
+
+    arg_parser = argparse.ArgumentParser(description="리소스 차단 정책 전후 페이지 로드 비교")
+    arg_parser.add_argument('url')
+    arg_parser.add_argument('--bank', default='BANK001')
+    arg_parser.add_argument('--driver', default=r"C:\chromedriver-win64\chromedriver.exe")
+    arg_parser.add_argument('--runs', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    driver = get_driver(args.driver, None)
+    try:
+        for label, use_policy in (('before', False), ('after', True)):
+            results = []
+            for _ in range(args.runs):
+                if use_policy:
+                    apply_resource_policy(driver, args.bank)
+                else:
+                    clear_resource_policy(driver)
+                driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+                driver.get('about:blank')
+                driver.get(args.url)
+                time.sleep(1)  # loadEventEnd 기록 대기
+                results.append(driver.execute_script(PAGE_LOAD_SCRIPT))
+            print(f"{label:<7} load {statistics.median(r['load_ms'] for r in results):8.0f}ms  "
+                  f"bytes {statistics.median(r['bytes'] for r in results):>10,.0f}  "
+                  f"resources {statistics.median(r['resources'] for r in results):>5.0f}")
+    finally:
+        driver.quit()
@@ -0,0 +1,294 @@
+import argparse
+import itertools
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+
+from coalesce import union_range
+import metrics
+from metrics import record
+
+# 요청 실행 순서 스케줄러 (execute_request 앞단)
+# - 은행코드별 동시 세션 수 제한 + 분당 요청 수 제한 (계정 잠금 / 접속 차단 방지)
+# - 병원(INI_HPTL_NO) 간 라운드로빈으로 한 병원의 대량 요청이 다른 병원을 밀어내지 않게 함
+# - 병원 내에서는 조회기간이 짧은 요청부터 (오래 기다린 요청은 우선순위 상승)
+# - 대기열 길이 / 대기시간은 metrics 로 기록 (stage: scheduler_wait)
+
+BANK_CONCURRENCY = {
+    'default': 2,
+    'BANK001': 2,
+}
+
+# 은행별 분당 최대 요청 수 (None 이면 제한 없음)
+BANK_RATE_PER_MINUTE = {
+    'default': None,
+    'BANK001': 30,
+}
+
+# 대기 AGING_SECONDS_PER_DAY 초마다 조회기간 1일만큼 우선순위 상승
+AGING_SECONDS_PER_DAY = 10
+
+
+def job_cost(requests):
+    """조회기간 일수 (묶음이면 합집합 기간)"""
+    start_date, end_date = union_range(requests)
+    return (end_date - start_date).days + 1
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute, burst, clock=time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self):
+        self._refill()
+        return self.tokens >= 1
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+    def seconds_until_available(self):
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class ScheduledJob:
+    """스케줄러에 들어간 요청 묶음 1건 (execute_request_group 에 넘길 requests)"""
+
+    _ids = itertools.count()
+
+    def __init__(self, requests, submitted_at):
+        self.job_id = next(self._ids)
+        self.requests = requests
+        self.bank_code = requests[0]['BANK_SE']
+        self.hospital = requests[0]['INI_HPTL_NO']
+        self.cost = job_cost(requests)
+        self.submitted_at = submitted_at
+
+
+class FairScheduler:
+    def __init__(self, bank_concurrency=None, bank_rate_per_minute=None, aging_seconds_per_day=AGING_SECONDS_PER_DAY,
+                 clock=time.monotonic):
+        self.bank_concurrency = bank_concurrency or BANK_CONCURRENCY
+        self.bank_rate_per_minute = bank_rate_per_minute or BANK_RATE_PER_MINUTE
+        self.aging_seconds_per_day = aging_seconds_per_day
+        self.clock = clock
+
+        self._queues = defaultdict(list)   # 병원 → 대기 작업 목록
+        self._rotation = deque()           # 라운드로빈 순서 (대기 작업이 있는 병원)
+        self._running = defaultdict(int)   # 은행 → 실행 중 작업 수
+        self._buckets = {}
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def _limit(self, bank_code):
+        return self.bank_concurrency.get(bank_code, self.bank_concurrency['default'])
+
+    def _bucket(self, bank_code):
+        if bank_code not in self._buckets:
+            rate = self.bank_rate_per_minute.get(bank_code, self.bank_rate_per_minute.get('default'))
+            self._buckets[bank_code] = TokenBucket(rate, self._limit(bank_code), self.clock) if rate else None
+        return self._buckets[bank_code]
+
+    def _admissible(self, bank_code):
+        if self._running[bank_code] >= self._limit(bank_code):
+            return False
+        bucket = self._bucket(bank_code)
+        return bucket is None or bucket.available()
+
+    def _priority(self, job, now):
+        return job.cost - (now - job.submitted_at) / self.aging_seconds_per_day
+
+    def pending(self):
+        with self._cond:
+            return sum(len(jobs) for jobs in self._queues.values())
+
+    def submit(self, requests):
+        with self._cond:
+            job = ScheduledJob(requests, self.clock())
+            if not self._queues[job.hospital]:
+                self._rotation.append(job.hospital)
+            self._queues[job.hospital].append(job)
+            self._cond.notify_all()
+            return job
+
+    def _pick(self):
+        """라운드로빈 순서대로 병원을 보며, 실행 가능한 은행의 작업 중 우선순위가 가장 높은 것 선택"""
+        now = self.clock()
+        for _ in range(len(self._rotation)):
+            hospital = self._rotation[0]
+            candidates = [job for job in self._queues[hospital] if self._admissible(job.bank_code)]
+            if candidates:
+                job = min(candidates, key=lambda j: (self._priority(j, now), j.job_id))
+                self._queues[hospital].remove(job)
+                self._rotation.popleft()
+                if self._queues[hospital]:
+                    self._rotation.append(hospital)
+                return job
+            self._rotation.rotate(-1)
+        return None
+
+    def _retry_after(self):
+        """속도 제한으로만 막힌 경우 다음 토큰까지 남은 시간"""
+        waits = []
+        for jobs in self._queues.values():
+            for job in jobs:
+                bucket = self._bucket(job.bank_code)
+                if bucket is not None and self._running[job.bank_code] < self._limit(job.bank_code):
+                    waits.append(bucket.seconds_until_available())
+        return min(waits) if waits else None
+
+    def acquire(self, timeout=None):
+        """실행할 작업을 꺼냄 (없으면 대기, timeout 또는 close 시 None)"""
+        deadline = None if timeout is None else self.clock() + timeout
+        job = None
+        with self._cond:
+            while not self._closed:
+                job = self._pick()
+                if job is not None:
+                    self._running[job.bank_code] += 1
+                    bucket = self._bucket(job.bank_code)
+                    if bucket is not None:
+                        bucket.take()
+                    waited = self.clock() - job.submitted_at
+                    depth = sum(len(jobs) for jobs in self._queues.values())
+                    running = self._running[job.bank_code]
+                    break
+
+                wait = self._retry_after()
+                if deadline is not None:
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        return None
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._cond.wait(wait)
+
+        if job is not None:
+            record('scheduler_wait', waited, bank_code=job.bank_code, hospital=job.hospital,
+                   cost_days=job.cost, queue_depth=depth, running=running)
+        return job
+
+    def done(self, job):
+        self.release_reserved(job.bank_code)
+
+    def try_reserve(self, bank_code):
+        """실행 중인 작업이 추가 세션(구간 병렬 조회 등)을 쓸 때 은행 동시 실행 / 속도 제한 한 칸을 기다리지 않고 점유
+        (여유가 없으면 False, 점유했으면 끝난 뒤 release_reserved 호출)"""
+        with self._cond:
+            if not self._admissible(bank_code):
+                return False
+            self._running[bank_code] += 1
+            bucket = self._bucket(bank_code)
+            if bucket is not None:
+                bucket.take()
+            return True
+
+    def release_reserved(self, bank_code):
+        with self._cond:
+            self._running[bank_code] -= 1
+            self._cond.notify_all()
+
+    def drain(self):
+        """대기 중인 작업을 모두 꺼내 반환 (종료 시 요청 반납용)"""
+        with self._cond:
+            jobs = [job for hospital in self._rotation for job in self._queues[hospital]]
+            self._queues.clear()
+            self._rotation.clear()
+            return jobs
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            now = self.clock()
+            waits = [now - job.submitted_at for jobs in self._queues.values() for job in jobs]
+            return {
+                'queue_depth': len(waits),
+                'oldest_wait_s': round(max(waits), 1) if waits else 0.0,
+                'by_hospital': {h: len(jobs) for h, jobs in self._queues.items() if jobs},
+                'running': {b: n for b, n in self._running.items() if n},
+            }
+
+
+def simulate(num_workers=4, seconds_per_day=0.002, seed=7):
+    """가상 요청 스트림으로 스케줄러 동작 확인 (실제 은행 접속 없음)
+    병원 H001 이 1년치 요청 50건을 먼저 넣고, 다른 병원들이 짧은 요청을 뒤이어 넣는 상황"""
+    rng = random.Random(seed)
+    metrics.METRICS_PATH = os.path.join(tempfile.mkdtemp(prefix='scheduler_sim_'), 'metrics.jsonl')
+    scheduler = FairScheduler(
+        bank_concurrency={'default': 2, 'BANK001': 2, 'BANK004': 1},
+        bank_rate_per_minute={'default': None, 'BANK001': 600},
+    )
+
+    jobs = []
+    base = datetime(2025, 1, 1)
+    for _ in range(50):
+        jobs.append(('H001', 'BANK001', 365))
+    for hospital in ('H002', 'H003', 'H004'):
+        for _ in range(5):
+            jobs.append((hospital, rng.choice(['BANK001', 'BANK004']), rng.choice([1, 7, 31])))
+
+    for req_seq, (hospital, bank_code, days) in enumerate(jobs, start=1):
+        scheduler.submit([{
+            'REQ_SEQ': req_seq, 'INI_HPTL_NO': hospital, 'BANK_SE': bank_code,
+            'SCH_BGNDE': base.strftime('%Y-%m-%d'),
+            'SCH_ENDDE': (base + timedelta(days=days - 1)).strftime('%Y-%m-%d'),
+        }])
+
+    start = time.monotonic()
+    finished = defaultdict(list)
+    peak_running = defaultdict(int)
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            job = scheduler.acquire(timeout=0.5)
+            if job is None:
+                return
+            with lock:
+                peak_running[job.bank_code] = max(peak_running[job.bank_code], scheduler._running[job.bank_code])
+            time.sleep(job.cost * seconds_per_day)
+            with lock:
+                finished[job.hospital].append(time.monotonic() - start)
+            scheduler.done(job)
+
+    threads = [threading.Thread(target=worker) for _ in range(num_workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"{'hospital':<10}{'jobs':>6}{'first done(s)':>16}{'last done(s)':>15}")
+    for hospital in sorted(finished):
+        times = sorted(finished[hospital])
+        print(f"{hospital:<10}{len(times):>6}{times[0]:>16.2f}{times[-1]:>15.2f}")
+    print("은행별 최대 동시 실행:", dict(peak_running))
+    print()
+    metrics.print_report(metrics.summarize(metrics.load_events(metrics.METRICS_PATH), 'hospital'), 'hospital')
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="공정 스케줄러 시뮬레이션")
+    arg_parser.add_argument('--workers', type=int, default=4)
+    arg_parser.add_argument('--seconds-per-day', type=float, default=0.002, help="조회기간 1일당 가상 처리시간")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    simulate(args.workers, args.seconds_per_day)
@@ -0,0 +1,193 @@
+import glob
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+from downloads import set_download_behavior
+
+
+def default_driver_factory(driver_path, download_dir, user_data_dir=None):
+    # selenium 등 브라우저 의존성은 첫 세션 생성 시 로드 (워커 기동 시간 단축)
+    from NH_BANK import get_driver
+    return get_driver(driver_path, download_dir, user_data_dir=user_data_dir)
+
+
+class BrowserSession:
+    """풀에서 관리하는 webdriver 세션 1개"""
+
+    def __init__(self, session_id, driver, download_dir, profile_dir=None):
+        self.session_id = session_id
+        self.driver = driver
+        self.download_dir = download_dir
+        self.profile_dir = profile_dir
+        self.uses = 0
+        self.created_at = time.time()
+
+
+class DriverSessionPool:
+    """미리 띄워둔 크롬 드라이버를 초기화 후 재사용하는 세션 풀
+    profile_root 지정 시 세션마다 별도의 크롬 프로필 폴더 사용 (동시에 실행되는 크롬끼리 프로필을 공유하지 않음)"""
+
+    def __init__(self, driver_path, download_root, size=1, max_uses=20, driver_factory=default_driver_factory,
+                 profile_root=None):
+        self.driver_path = driver_path
+        self.download_root = download_root
+        self.profile_root = profile_root
+        self.size = size
+        self.max_uses = max_uses
+        self.driver_factory = driver_factory
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._live = 0
+        self._closed = False
+
+    def _create_session(self):
+        with self._lock:
+            session_id = self._next_id
+            self._next_id += 1
+            self._live += 1
+
+        download_dir = os.path.join(self.download_root, f"session_{session_id}")
+        os.makedirs(download_dir, exist_ok=True)
+        profile_dir = None
+        try:
+            if self.profile_root:
+                # 세션 번호는 프로세스 안에서만 유일하므로 이전 실행에서 남은 프로필은 지우고 새로 시작
+                profile_dir = os.path.join(self.profile_root, f"session_{session_id}")
+                shutil.rmtree(profile_dir, ignore_errors=True)
+                os.makedirs(profile_dir, exist_ok=True)
+                driver = self.driver_factory(self.driver_path, download_dir, user_data_dir=profile_dir)
+            else:
+                driver = self.driver_factory(self.driver_path, download_dir)
+        except Exception:
+            with self._lock:
+                self._live -= 1
+            raise
+
+        logging.info(f"[세션풀] 세션 {session_id} 생성")
+        return BrowserSession(session_id, driver, download_dir, profile_dir)
+
+    def _discard(self, session):
+        try:
+            session.driver.quit()
+        except Exception as e:
+            logging.warning(f"[세션풀] 세션 {session.session_id} 종료 중 에러: {e}")
+        if session.profile_dir:
+            shutil.rmtree(session.profile_dir, ignore_errors=True)
+        with self._lock:
+            self._live -= 1
+        logging.info(f"[세션풀] 세션 {session.session_id} 폐기 (사용횟수 {session.uses})")
+
+    def warm_up(self, count=None):
+        """풀 크기(또는 count)만큼 드라이버를 미리 실행 - 나머지는 필요할 때 생성"""
+        target = self.size if count is None else min(count, self.size)
+        while True:
+            with self._lock:
+                if self._live >= target:
+                    break
+            self._idle.put(self._create_session())
+
+    def is_healthy(self, session):
+        try:
+            session.driver.window_handles
+            return session.driver.execute_script("return 1;") == 1
+        except Exception:
+            return False
+
+    def reset(self, session):
+        """다음 요청을 위해 창, 쿠키, 스토리지, 다운로드 폴더 초기화"""
+        driver = session.driver
+
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+
+        try:
+            driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+        except Exception:
+            pass  # about:blank 등 스토리지 접근 불가 페이지
+
+        driver.delete_all_cookies()
+        driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+        driver.get('about:blank')
+
+        for path in glob.glob(os.path.join(session.download_dir, '*')):
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+
+    def set_download_dir(self, session, download_dir):
+        """요청별 다운로드 폴더로 크롬 다운로드 경로 변경"""
+        set_download_behavior(session.driver, download_dir)
+
+    def acquire(self, timeout=None):
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_create = self._live < self.size
+                if can_create:
+                    return self._create_session()
+                session = self._idle.get(timeout=timeout)
+
+            if self.is_healthy(session):
+                return session
+
+            logging.warning(f"[세션풀] 세션 {session.session_id} 응답 없음 → 재생성")
+            self._discard(session)
+
+    def try_acquire(self):
+        """남는 세션이 있거나 새로 만들 수 있을 때만 반환 (없으면 기다리지 않고 None)"""
+        try:
+            return self.acquire(timeout=0)
+        except queue.Empty:
+            return None
+
+    def release(self, session, broken=False):
+        session.uses += 1
+
+        if self._closed or broken or session.uses >= self.max_uses:
+            self._discard(session)
+            return
+
+        try:
+            self.reset(session)
+        except Exception as e:
+            logging.warning(f"[세션풀] 세션 {session.session_id} 초기화 실패: {e}")
+            self._discard(session)
+            return
+
+        self._idle.put(session)
+
+    @contextmanager
+    def session(self, download_dir=None, timeout=None):
+        session = self.acquire(timeout=timeout)
+        try:
+            if download_dir:
+                self.set_download_dir(session, download_dir)
+            yield session
+        except Exception:
+            self.release(session, broken=True)
+            raise
+        else:
+            self.release(session)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(session)
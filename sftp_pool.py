@@ -0,0 +1,154 @@
+import io
+import logging
+import posixpath
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import paramiko
+
+
+class SFTPConnectionPool:
+    """SSH 연결 1개를 유지하면서 SFTP 채널을 재사용하는 업로드 풀"""
+
+    def __init__(self, host, port, username, password, size=2, keepalive=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.keepalive = keepalive
+
+        self._lock = threading.Lock()
+        self._transport = None
+        self._generation = 0
+        self._idle = queue.LifoQueue()
+        self._known_dirs = set()
+        self._dirs_lock = threading.Lock()
+
+    def _ensure_transport(self):
+        with self._lock:
+            if self._transport is not None and self._transport.is_active():
+                return self._transport, self._generation
+
+            if self._transport is not None:
+                logging.warning("SFTP 연결 끊김 → 재연결")
+                self._transport.close()
+
+            transport = paramiko.Transport((self.host, self.port))
+            transport.connect(username=self.username, password=self.password)
+            transport.set_keepalive(self.keepalive)
+            self._transport = transport
+            self._generation += 1
+            logging.info(f"SFTP 연결 생성: {self.host}:{self.port}")
+            return self._transport, self._generation
+
+    def _acquire(self):
+        transport, generation = self._ensure_transport()
+        while True:
+            try:
+                client_generation, sftp = self._idle.get_nowait()
+            except queue.Empty:
+                return generation, paramiko.SFTPClient.from_transport(transport)
+            if client_generation == generation:
+                return client_generation, sftp
+            sftp.close()  # 재연결 이전 채널 폐기
+
+    def _release(self, generation, sftp, broken=False):
+        if broken or generation != self._generation or self._idle.qsize() >= self.size:
+            try:
+                sftp.close()
+            except Exception:
+                pass
+            return
+        self._idle.put((generation, sftp))
+
+    def makedirs(self, sftp, remote_directory):
+        """원격 경로가 없으면 재귀적으로 생성 (이미 확인한 경로는 캐시)"""
+        with self._dirs_lock:
+            if remote_directory in self._known_dirs:
+                return
+
+        path = ''
+        for dir_component in remote_directory.split('/'):
+            if not dir_component:
+                continue
+            path += '/' + dir_component
+            with self._dirs_lock:
+                if path in self._known_dirs:
+                    continue
+            try:
+                sftp.stat(path)
+            except FileNotFoundError:
+                try:
+                    sftp.mkdir(path)
+                except IOError:
+                    sftp.stat(path)  # 다른 스레드가 먼저 생성한 경우
+            with self._dirs_lock:
+                self._known_dirs.add(path)
+
+        with self._dirs_lock:
+            self._known_dirs.add(remote_directory)
+
+    def forget_dirs(self, remote_directory):
+        """remote_directory 와 상위 경로를 캐시에서 제거 (원격 폴더가 삭제된 경우 다시 확인 / 생성)"""
+        with self._dirs_lock:
+            self._known_dirs = {
+                path for path in self._known_dirs
+                if not (remote_directory == path or remote_directory.startswith(path.rstrip('/') + '/'))
+            }
+
+    def upload(self, source, remote_path, retries=1):
+        """source 가 경로면 put, bytes / 파일객체면 putfo 로 업로드"""
+        for attempt in range(retries + 1):
+            generation, sftp = self._acquire()
+            try:
+                self.makedirs(sftp, posixpath.dirname(remote_path))
+                if isinstance(source, (bytes, bytearray)):
+                    sftp.putfo(io.BytesIO(source), remote_path)
+                elif hasattr(source, 'read'):
+                    source.seek(0)
+                    sftp.putfo(source, remote_path)
+                else:
+                    sftp.put(source, remote_path)
+            except (paramiko.SSHException, EOFError, OSError) as e:
+                if isinstance(e, OSError):
+                    # FileNotFoundError / IOError: 캐시된 원격 폴더가 삭제됐을 수 있으므로 재시도 때 다시 생성
+                    self.forget_dirs(posixpath.dirname(remote_path))
+                self._release(generation, sftp, broken=True)
+                if attempt >= retries:
+                    raise
+                logging.warning(f"SFTP 업로드 재시도 ({remote_path}): {e}")
+                continue
+
+            self._release(generation, sftp)
+            logging.info(f"SFTP 업로드 완료: {remote_path}")
+            return remote_path
+
+    def upload_many(self, items, on_complete=None):
+        """(source, remote_path) 목록을 동시에 업로드
+        on_complete(remote_path) 는 성공한 파일마다 호출 (일부 실패 시에도 성공분은 호출 후 첫 에러 발생)"""
+        def upload_one(source, remote_path):
+            result = self.upload(source, remote_path)
+            if on_complete is not None:
+                on_complete(remote_path)
+            return result
+
+        if len(items) <= 1:
+            return [upload_one(source, remote_path) for source, remote_path in items]
+
+        with ThreadPoolExecutor(max_workers=min(len(items), self.size)) as executor:
+            futures = [executor.submit(upload_one, source, remote_path) for source, remote_path in items]
+            return [future.result() for future in futures]
+
+    def close(self):
+        while True:
+            try:
+                _, sftp = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            sftp.close()
+        with self._lock:
+            if self._transport is not None:
+                self._transport.close()
+                self._transport = None
@@ -0,0 +1,281 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime, timedelta
+
+# 계좌별 거래내역 로컬 캐시 (SQLite)
+# 오늘 이전 날짜는 조회가 끝나면 변하지 않는 것으로 보고 재사용, 오늘 및 미조회 구간만 새로 조회
+# - 캐시 키는 은행 / 계좌 + scope(병원, 인증정보) 의 HMAC: 같은 계좌라도 다른 병원이나 다른 비밀번호로 요청하면
+#   캐시를 쓰지 않고 은행에서 다시 조회 (인증정보가 틀리면 은행 조회에서 실패)
+# - 거래내역 행은 날짜별로 AES-GCM 암호화해 저장 (키는 생성자 인자, 파일에는 평문 거래내역 없음)
+
+DATE_FORMAT = '%Y-%m-%d'
+NONCE_SIZE = 12
+
+
+def derive_key(master_key, purpose):
+    return hashlib.sha256(purpose.encode('utf-8') + b':' + master_key).digest()
+
+
+def account_key(bank_code, account, scope, secret):
+    """계좌번호 / 인증정보를 그대로 저장하지 않도록 비밀키 HMAC 으로 변환 (키 없이는 대입 공격 불가)"""
+    message = '\x1f'.join([bank_code, account, scope]).encode('utf-8')
+    return hmac.new(secret, message, hashlib.sha256).hexdigest()
+
+
+def date_column_index(headers):
+    for idx, header in enumerate(headers):
+        if '거래' in header and '일' in header:
+            return idx
+    return 0
+
+
+def sequence_column_index(headers):
+    """조회결과의 순번 컬럼 위치 (없으면 None)"""
+    for idx, header in enumerate(headers):
+        if str(header).replace(' ', '') in ('순번', '번호', 'No', 'No.'):
+            return idx
+    return None
+
+
+def renumber_rows(headers, rows):
+    """구간별로 다시 시작된 순번을 합친 순서대로 1부터 다시 매김"""
+    seq_idx = sequence_column_index(headers)
+    if seq_idx is None:
+        return rows
+    renumbered = []
+    for number, row in enumerate(rows, start=1):
+        row = list(row)
+        if len(row) > seq_idx:
+            row[seq_idx] = str(number)
+        renumbered.append(row)
+    return renumbered
+
+
+def parse_row_date(value):
+    """'2025/05/01 10:00:00', '2025-05-01', '20250501' 등에서 날짜 추출"""
+    digits = re.sub(r'\D', '', str(value))[:8]
+    if len(digits) != 8:
+        return None
+    try:
+        return datetime.strptime(digits, '%Y%m%d').strftime(DATE_FORMAT)
+    except ValueError:
+        return None
+
+
+def iter_days(start_date, end_date):
+    day = start_date
+    while day <= end_date:
+        yield day
+        day += timedelta(days=1)
+
+
+def collapse_days(days):
+    """연속된 날짜 목록을 (시작일, 종료일) 구간 목록으로 묶음"""
+    spans = []
+    for day in sorted(days):
+        if spans and day - spans[-1][1] == timedelta(days=1):
+            spans[-1] = (spans[-1][0], day)
+        else:
+            spans.append((day, day))
+    return spans
+
+
+class TransactionCache:
+    """key: 32바이트 비밀키 (HMAC 키 / 암호화 키를 여기서 파생)"""
+
+    def __init__(self, path, key):
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+        if len(key) != 32:
+            raise ValueError("거래내역 캐시 키는 32바이트여야 합니다.")
+        self.path = path
+        self._hmac_key = derive_key(key, 'transaction-cache-account')
+        self._cipher = AESGCM(derive_key(key, 'transaction-cache-rows'))
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._drop_plaintext_tables(conn)
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS tx_day_rows (
+                    account_key TEXT, tx_date TEXT, rows_blob BLOB,
+                    PRIMARY KEY (account_key, tx_date)
+                );
+                CREATE TABLE IF NOT EXISTS tx_days (
+                    account_key TEXT, tx_date TEXT, fetched_at TEXT,
+                    PRIMARY KEY (account_key, tx_date)
+                );
+                CREATE TABLE IF NOT EXISTS tx_meta (
+                    account_key TEXT PRIMARY KEY, headers_json TEXT, descending INTEGER, updated_at TEXT
+                );
+            """)
+            conn.commit()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def _drop_plaintext_tables(conn):
+        """이전 버전의 평문 행 테이블(tx_rows)이 있으면 캐시를 비우고 파일에서 지움 (키 형식도 달라 재사용 불가)"""
+        legacy = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tx_rows'").fetchone()
+        if legacy is None:
+            return
+        conn.executescript("""
+            DROP TABLE tx_rows;
+            DROP TABLE IF EXISTS tx_days;
+            DROP TABLE IF EXISTS tx_meta;
+        """)
+        conn.commit()
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        logging.warning("[거래내역 캐시] 평문 캐시 테이블 삭제 (암호화 캐시로 새로 조회)")
+
+    def _account_key(self, bank_code, account, scope):
+        return account_key(bank_code, account, scope, self._hmac_key)
+
+    def _encrypt_rows(self, key, tx_date, rows):
+        nonce = os.urandom(NONCE_SIZE)
+        data = json.dumps(rows, ensure_ascii=False).encode('utf-8')
+        return nonce + self._cipher.encrypt(nonce, data, f"{key}:{tx_date}".encode('utf-8'))
+
+    def _decrypt_rows(self, key, tx_date, blob):
+        blob = bytes(blob)
+        data = self._cipher.decrypt(blob[:NONCE_SIZE], blob[NONCE_SIZE:], f"{key}:{tx_date}".encode('utf-8'))
+        return json.loads(data.decode('utf-8'))
+
+    def missing_spans(self, bank_code, account, start_date, end_date, today=None, scope=''):
+        """캐시에 확정 저장되지 않은 날짜 구간 (오늘 이후는 항상 재조회)"""
+        today = (today or datetime.today()).date()
+        key = self._account_key(bank_code, account, scope)
+        with closing(self._connect()) as conn:
+            closed_days = {row[0] for row in conn.execute(
+                "SELECT tx_date FROM tx_days WHERE account_key = ? AND tx_date BETWEEN ? AND ?",
+                (key, start_date.strftime(DATE_FORMAT), end_date.strftime(DATE_FORMAT))
+            )}
+
+        missing = [
+            day for day in iter_days(start_date.date(), end_date.date())
+            if day >= today or day.strftime(DATE_FORMAT) not in closed_days
+        ]
+        return [
+            (datetime.combine(span_start, datetime.min.time()), datetime.combine(span_end, datetime.min.time()))
+            for span_start, span_end in collapse_days(missing)
+        ]
+
+    def store_rows(self, bank_code, account, headers, rows, span_start, span_end, descending=None, today=None,
+                   scope=''):
+        """조회한 구간의 행을 날짜별로 암호화해 교체 저장하고, 오늘 이전 날짜는 확정(불변) 처리"""
+        today_str = (today or datetime.today()).strftime(DATE_FORMAT)
+        now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        key = self._account_key(bank_code, account, scope)
+        date_idx = date_column_index(headers)
+
+        with closing(self._connect()) as conn:
+            existing = conn.execute("SELECT descending FROM tx_meta WHERE account_key = ?", (key,)).fetchone()
+        if descending is None:
+            # 정렬 방향을 알 수 없으면(행이 하루치뿐 등) 기존에 판단한 방향 유지
+            descending = bool(existing[0]) if existing else False
+
+        chronological = list(reversed(rows)) if descending else list(rows)
+        by_day = {}
+        for row in chronological:
+            tx_date = parse_row_date(row[date_idx]) if len(row) > date_idx else None
+            if tx_date is None:
+                logging.warning(f"[거래내역 캐시] 날짜를 알 수 없는 행 제외: {row}")
+                continue
+            by_day.setdefault(tx_date, []).append(row)
+
+        span_days = [day.strftime(DATE_FORMAT) for day in iter_days(span_start.date(), span_end.date())]
+        with self._lock, closing(self._connect()) as conn:
+            for tx_date in span_days:
+                conn.execute(
+                    "INSERT OR REPLACE INTO tx_day_rows (account_key, tx_date, rows_blob) VALUES (?, ?, ?)",
+                    (key, tx_date, self._encrypt_rows(key, tx_date, by_day.get(tx_date, [])))
+                )
+                if tx_date < today_str:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO tx_days (account_key, tx_date, fetched_at) VALUES (?, ?, ?)",
+                        (key, tx_date, now_str)
+                    )
+            if headers:
+                conn.execute(
+                    "INSERT OR REPLACE INTO tx_meta (account_key, headers_json, descending, updated_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(headers, ensure_ascii=False), int(descending), now_str)
+                )
+            conn.commit()
+
+    def load_rows(self, bank_code, account, start_date, end_date, scope=''):
+        """캐시된 헤더와 행을 은행 화면과 같은 정렬 순서로 반환 (순번은 합친 순서대로 다시 매김)"""
+        key = self._account_key(bank_code, account, scope)
+        with closing(self._connect()) as conn:
+            meta = conn.execute(
+                "SELECT headers_json, descending FROM tx_meta WHERE account_key = ?", (key,)
+            ).fetchone()
+            rows = []
+            for tx_date, blob in conn.execute(
+                "SELECT tx_date, rows_blob FROM tx_day_rows WHERE account_key = ? AND tx_date BETWEEN ? AND ? "
+                "ORDER BY tx_date",
+                (key, start_date.strftime(DATE_FORMAT), end_date.strftime(DATE_FORMAT))
+            ):
+                rows.extend(self._decrypt_rows(key, tx_date, blob))
+
+        if meta is None:
+            return [], rows
+        headers, descending = json.loads(meta[0]), bool(meta[1])
+        return headers, renumber_rows(headers, list(reversed(rows)) if descending else rows)
+
+    def fetch(self, bank_code, account, start_date, end_date, fetch_rows, is_descending=None, scope=''):
+        """미조회 구간만 fetch_rows(시작일, 종료일) 로 조회해 저장한 뒤 전체 구간 반환
+        scope: 병원 / 인증정보 등 캐시를 나눌 기준 (같은 scope 로 저장한 행만 재사용)"""
+        spans = self.missing_spans(bank_code, account, start_date, end_date, scope=scope)
+        logging.info(f"[거래내역 캐시] 조회 필요 구간 {len(spans)}개: "
+                     + ", ".join(f"{s:%Y-%m-%d}~{e:%Y-%m-%d}" for s, e in spans))
+
+        for span_start, span_end in spans:
+            headers, rows = fetch_rows(span_start, span_end)
+            descending = None
+            if is_descending and len(self._row_dates(headers, rows)) > 1:
+                # 같은 날짜 행끼리는 방향을 판단할 수 없음 (오늘만 재조회 등) → 날짜가 2개 이상일 때만 갱신
+                descending = is_descending(headers, rows)
+            self.store_rows(bank_code, account, headers, rows, span_start, span_end, descending=descending,
+                            scope=scope)
+
+        return self.load_rows(bank_code, account, start_date, end_date, scope=scope)
+
+    @staticmethod
+    def _row_dates(headers, rows):
+        date_idx = date_column_index(headers)
+        return {parse_row_date(row[date_idx]) for row in rows if len(row) > date_idx} - {None}
+
+    def evict(self, retention_days):
+        """마지막 조회 후 retention_days 가 지난 날짜 데이터 삭제
+        오늘 날짜로 저장돼 확정(tx_days)되지 않은 행도 거래일이 retention_days 보다 오래되면 삭제하고,
+        남은 행이 없는 계좌는 헤더 / 정렬 정보(tx_meta)도 삭제"""
+        cutoff_time = datetime.now() - timedelta(days=retention_days)
+        cutoff = cutoff_time.strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock, closing(self._connect()) as conn:
+            stale = conn.execute(
+                "SELECT account_key, tx_date FROM tx_days WHERE fetched_at < ?", (cutoff,)
+            ).fetchall()
+            conn.executemany("DELETE FROM tx_day_rows WHERE account_key = ? AND tx_date = ?", stale)
+            conn.executemany("DELETE FROM tx_days WHERE account_key = ? AND tx_date = ?", stale)
+            orphaned = conn.execute(
+                "DELETE FROM tx_day_rows WHERE tx_date < ? AND NOT EXISTS ("
+                "SELECT 1 FROM tx_days WHERE tx_days.account_key = tx_day_rows.account_key "
+                "AND tx_days.tx_date = tx_day_rows.tx_date)",
+                (cutoff_time.strftime(DATE_FORMAT),)
+            ).rowcount
+            conn.execute(
+                "DELETE FROM tx_meta WHERE NOT EXISTS ("
+                "SELECT 1 FROM tx_day_rows WHERE tx_day_rows.account_key = tx_meta.account_key)"
+            )
+            conn.commit()
+        logging.info(f"[거래내역 캐시] {len(stale) + orphaned}일치 데이터 정리 (기준 {retention_days}일)")
+        return len(stale) + orphaned
@@ -0,0 +1,185 @@
+import csv
+import io
+import os
+import re
+from array import array
+from datetime import datetime
+
+from excel_stream import iter_row_chunks, new_buffer
+from nh_parser import COLUMN_KEYWORDS, find_column
+
+# 은행 공통 거래내역 표현 (열 기반)
+# 행마다 dict 를 만들지 않고 필드별 배열로 보관 - 금액은 정수(array 'q'), 거래일시는 datetime
+# 원본 / 업로드용 xlsx 와 함께 Parquet(pyarrow 설치 시) / CSV 로 내보내 하위 시스템이 엑셀을 다시 파싱하지 않도록 함
+
+# 필드명 ← 거래내역 항목 (nh_parser.COLUMN_KEYWORDS 의 헤더 키워드로 조회결과 컬럼을 찾음)
+FIELDS = [
+    ('tx_time', '거래일시'),
+    ('withdrawal', '출금금액'),
+    ('deposit', '입금금액'),
+    ('balance', '거래후잔액'),
+    ('description', '거래내용'),
+    ('memo', '거래기록사항'),
+    ('branch', '거래점'),
+]
+AMOUNT_FIELDS = ('withdrawal', 'deposit', 'balance')
+TEXT_FIELDS = ('description', 'memo', 'branch')
+
+EXPORT_FORMATS = ('parquet', 'csv')
+
+_DATETIME_FORMATS = {8: '%Y%m%d', 12: '%Y%m%d%H%M', 14: '%Y%m%d%H%M%S'}
+_AMOUNT_PATTERN = re.compile(r'^(-?)(\d+)(?:\.(\d+))?$')
+
+
+def parse_amount(amount_text):
+    """'1,234원', '-1,234', '1,234.00' 또는 숫자 셀(엑셀) 금액을 정수로 변환
+    부호는 유지하고, 원 단위 미만 금액이나 숫자가 아닌 값은 잘못 합쳐지지 않도록 ValueError"""
+    if isinstance(amount_text, float) and not amount_text.is_integer():
+        raise ValueError(f"원 단위 미만 금액은 지원하지 않습니다: {amount_text!r}")
+    if isinstance(amount_text, (int, float)):
+        return int(amount_text)
+    amount_clean = re.sub(r'[^\d.\-]', '', str(amount_text or ''))
+    if amount_clean in ('', '-'):
+        return 0
+    match = _AMOUNT_PATTERN.match(amount_clean)
+    if match is None:
+        raise ValueError(f"금액 형식 오류: {amount_text!r}")
+    sign, whole, fraction = match.groups()
+    if fraction and int(fraction):
+        raise ValueError(f"원 단위 미만 금액은 지원하지 않습니다: {amount_text!r}")
+    return -int(whole) if sign else int(whole)
+
+
+def parse_tx_datetime(value):
+    """'2025/05/01 10:00:00', '2025-05-01', datetime 셀 등에서 거래일시 추출 (실패 시 None)"""
+    if isinstance(value, datetime):
+        return value
+    digits = re.sub(r'\D', '', str(value or ''))
+    for length in (14, 12, 8):
+        if len(digits) >= length:
+            try:
+                return datetime.strptime(digits[:length], _DATETIME_FORMATS[length])
+            except ValueError:
+                continue
+    return None
+
+
+def _text(value):
+    return '' if value is None else str(value).strip()
+
+
+class TransactionColumns:
+    """거래내역 열 기반 컨테이너 (append_rows 로 페이지 / 청크 단위 추가 가능)"""
+
+    __slots__ = ('tx_time', 'withdrawal', 'deposit', 'balance', 'description', 'memo', 'branch')
+
+    def __init__(self):
+        self.tx_time = []
+        self.withdrawal = array('q')
+        self.deposit = array('q')
+        self.balance = array('q')
+        self.description = []
+        self.memo = []
+        self.branch = []
+
+    def __len__(self):
+        return len(self.tx_time)
+
+    @staticmethod
+    def _column_indexes(headers):
+        indexes = {}
+        for field, target in FIELDS:
+            keywords = dict(COLUMN_KEYWORDS)[target]
+            column = find_column(headers, keywords)
+            indexes[field] = headers.index(column) if column is not None else None
+        return indexes
+
+    def append_rows(self, headers, rows):
+        indexes = self._column_indexes(list(headers))
+
+        def cell(row, field):
+            idx = indexes[field]
+            return row[idx] if idx is not None and idx < len(row) else None
+
+        for row in rows:
+            self.tx_time.append(parse_tx_datetime(cell(row, 'tx_time')))
+            for field in AMOUNT_FIELDS:
+                getattr(self, field).append(parse_amount(cell(row, field)))
+            for field in TEXT_FIELDS:
+                getattr(self, field).append(_text(cell(row, field)))
+        return self
+
+    @classmethod
+    def from_rows(cls, headers, rows):
+        return cls().append_rows(headers, rows)
+
+    @classmethod
+    def from_workbook(cls, source):
+        """원본 엑셀(경로 또는 메모리 버퍼)에서 생성 - 제목 행은 건너뛰고 청크 단위로 읽음"""
+        if hasattr(source, 'getvalue'):
+            source = source.getvalue()
+        columns = cls()
+        for headers, rows in iter_row_chunks(source):
+            columns.append_rows(headers, rows)
+        return columns
+
+    def to_csv(self, dest):
+        """UTF-8(BOM) CSV. 거래일시는 ISO 형식, 금액은 정수"""
+        text = io.StringIO(newline='')
+        writer = csv.writer(text)
+        writer.writerow([field for field, _ in FIELDS])
+        for idx in range(len(self)):
+            tx_time = self.tx_time[idx]
+            writer.writerow([
+                tx_time.isoformat(sep=' ') if tx_time else '',
+                self.withdrawal[idx], self.deposit[idx], self.balance[idx],
+                self.description[idx], self.memo[idx], self.branch[idx],
+            ])
+        data = text.getvalue().encode('utf-8-sig')
+        if hasattr(dest, 'write'):
+            dest.write(data)
+            dest.seek(0)
+        else:
+            with open(dest, 'wb') as f:
+                f.write(data)
+        return dest
+
+    def to_arrow(self):
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("Parquet 저장에는 pyarrow 가 필요합니다 (pip install pyarrow)") from e
+
+        return pa.table({
+            'tx_time': pa.array(self.tx_time, type=pa.timestamp('s')),
+            'withdrawal': pa.array(self.withdrawal, type=pa.int64()),
+            'deposit': pa.array(self.deposit, type=pa.int64()),
+            'balance': pa.array(self.balance, type=pa.int64()),
+            'description': pa.array(self.description, type=pa.string()),
+            'memo': pa.array(self.memo, type=pa.string()),
+            'branch': pa.array(self.branch, type=pa.string()),
+        })
+
+    def to_parquet(self, dest):
+        import pyarrow.parquet as pq
+
+        pq.write_table(self.to_arrow(), dest, compression='zstd')
+        if hasattr(dest, 'seek'):
+            dest.seek(0)
+        return dest
+
+
+def export_transactions(columns, formats, base_name, download_dir=None, keep_local=False):
+    """요청한 형식(parquet / csv)으로 내보내고 [(형식, 경로 또는 버퍼)] 반환"""
+    exports = []
+    for fmt in formats:
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"지원하지 않는 출력 형식: {fmt}")
+        filename = f"{base_name}.{fmt}"
+        if keep_local:
+            os.makedirs(download_dir, exist_ok=True)
+            dest = os.path.join(download_dir, filename)
+        else:
+            dest = new_buffer(filename)
+        exports.append((fmt, columns.to_parquet(dest) if fmt == 'parquet' else columns.to_csv(dest)))
+    return exports
@@ -0,0 +1,73 @@
+import logging
+import time
+
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+
+def wait_until(driver, condition, timeout=10, description='', poll_frequency=0.1, raise_on_timeout=True):
+    """조건이 충족되는 즉시 반환하고 실제 대기 시간을 로그로 남김"""
+    start = time.monotonic()
+    try:
+        result = WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(condition)
+    except TimeoutException:
+        elapsed = time.monotonic() - start
+        logging.warning(f"[대기 시간초과] {description} ({elapsed:.2f}s / 제한 {timeout}s)")
+        if raise_on_timeout:
+            raise
+        return None
+
+    elapsed = time.monotonic() - start
+    logging.info(f"[대기 완료] {description} ({elapsed:.2f}s)")
+    return result
+
+
+def count_elements(driver, selector):
+    return driver.execute_script("return document.querySelectorAll(arguments[0]).length;", selector)
+
+
+def document_ready(driver):
+    return driver.execute_script("return document.readyState;") == 'complete'
+
+
+def row_count_greater_than(selector, count):
+    """selector에 해당하는 행 수가 count보다 커지면 새 행 수를 반환"""
+    def _condition(driver):
+        current = count_elements(driver, selector)
+        return current if current > count else False
+    return _condition
+
+
+def element_gone(selector):
+    """selector 요소가 없거나 화면에서 사라졌는지 확인"""
+    def _condition(driver):
+        try:
+            return not any(el.is_displayed() for el in driver.find_elements(By.CSS_SELECTOR, selector))
+        except StaleElementReferenceException:
+            return False
+    return _condition
+
+
+def element_focused(element):
+    def _condition(driver):
+        return driver.execute_script("return document.activeElement === arguments[0];", element)
+    return _condition
+
+
+def value_accepted(element, expected, normalize=lambda v: v.replace('-', '').strip()):
+    """입력창 값이 기대값과 같아졌는지 확인"""
+    def _condition(driver):
+        value = element.get_attribute('value') or ''
+        return normalize(value) == expected
+    return _condition
+
+
+def any_of(*conditions):
+    def _condition(driver):
+        for condition in conditions:
+            result = condition(driver)
+            if result:
+                return result
+        return False
+    return _condition